@@ -0,0 +1,102 @@
+"""
+Decode time of transactions and categories, json vs typed (msgspec)
+
+Decodes a synthetic `/transactions` response into local store rows the way
+`refresh` does, then those rows the way `get_transactions` and
+`get_categories` read them back, and builds the models out of them, with
+both decoders.
+
+    python -m benchmarks.decode --transactions 100000
+"""
+
+import argparse
+import gc
+import json
+import time
+
+from benchmarks.model_memory import synthetic_payload
+from models import Category, LazyTransaction
+from services._ynab_connection import decoding
+from services._ynab_connection.json_stream import JSONArrayStream
+
+
+def synthetic_categories(size):
+    return [
+        json.dumps(
+            {
+                "id": f"cat{i:04d}-0000-0000-0000-000000000000",
+                "category_group_id": f"grp{i % 8:04d}-0000-0000-0000-000000000000",
+                "category_group_name": f"Group {i % 8}",
+                "name": f"Category {i}",
+                "hidden": False,
+                "original_category_group_id": None,
+                "note": None,
+                "budgeted": 100000,
+                "activity": -50000,
+                "balance": 50000,
+                "goal_type": None,
+                "goal_target": 0,
+                "deleted": False,
+            }
+        )
+        for i in range(size)
+    ]
+
+
+def response_rows(decode_delta, payload):
+    """Local store rows of a `/transactions` response, as `refresh` makes them"""
+    if decode_delta:
+        return decode_delta("transactions", payload)[0]
+    items = JSONArrayStream("transactions").items([payload])
+    return ((item, json.dumps(item)) for item in items)
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode benchmark")
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--categories", type=int, default=5000)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.transactions).encode()
+    transaction_rows = [
+        json.dumps(transaction)
+        for transaction in json.loads(payload)["data"]["transactions"]
+    ]
+    category_rows = synthetic_categories(args.categories)
+
+    modes = [("json", False)] + ([("typed", True)] if decoding.msgspec else [])
+    if not decoding.msgspec:
+        print("msgspec is not installed, only the json decoder is measured")
+
+    for name, fast in modes:
+        decode_transaction, decode_category = decoding.decoders(fast)
+        decode_delta = decoding.delta_decoder(fast)
+        _, response_time = timed(
+            lambda: sum(1 for _ in response_rows(decode_delta, payload))
+        )
+        transactions, decode_time = timed(
+            lambda: [LazyTransaction(decode_transaction(row)) for row in transaction_rows]
+        )
+        _, build_time = timed(lambda: [t.identifier for t in transactions])
+        _, categories_time = timed(
+            lambda: [Category(**decode_category(row)) for row in category_rows]
+        )
+        print(
+            f"{name:>5}: response to rows in {response_time:.3f}s, "
+            f"{len(transactions)} transactions decoded in {decode_time:.3f}s "
+            f"(+{build_time:.3f}s to build them all), "
+            f"{len(category_rows)} categories in {categories_time:.3f}s"
+        )
+        # Keep one mode's models from slowing the next one's collections
+        del transactions
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
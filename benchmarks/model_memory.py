@@ -0,0 +1,133 @@
+"""
+Memory used by the models of a large budget
+
+Builds a synthetic budget (50k transactions by default, with the repeated
+account, category, payee and date strings of a real one), decodes it from
+JSON like the client does and reports what the Transaction objects keep
+alive, plus the payloads made out of them.
+
+    python -m benchmarks.model_memory --transactions 50000
+"""
+
+import argparse
+import gc
+import json
+import random
+import resource
+import tracemalloc
+from datetime import date, timedelta
+
+from models import Transaction
+from services._ynab_connection import CreateTransactionInterface
+
+
+def synthetic_payload(size, seed=0):
+    rng = random.Random(seed)
+    accounts = [(f"acc{i:04d}-0000-0000-0000-000000000000", f"Account {i}") for i in range(6)]
+    categories = [(f"cat{i:04d}-0000-0000-0000-000000000000", f"Category {i}") for i in range(60)]
+    payees = [(f"pay{i:04d}-0000-0000-0000-000000000000", f"Payee {i}") for i in range(400)]
+    first_day = date(2023, 1, 1)
+
+    transactions = []
+    for i in range(size):
+        account_id, account_name = rng.choice(accounts)
+        category_id, category_name = rng.choice(categories)
+        payee_id, payee_name = rng.choice(payees)
+        day = (first_day + timedelta(days=rng.randrange(3 * 365))).isoformat()
+        memo = f"Purchase {i}" + (f" [TC:{rng.uniform(6, 14):.2f}]" if i % 50 == 0 else "")
+        subtransactions = []
+        if i % 20 == 0:
+            subtransactions = [
+                {
+                    "id": f"sub{i:08d}-{n}",
+                    "transaction_id": f"{i:08x}-0000-0000-0000-000000000000",
+                    "amount": -1000 * n,
+                    "memo": None,
+                    "payee_id": payee_id,
+                    "payee_name": payee_name,
+                    "category_id": category_id,
+                    "category_name": category_name,
+                    "transfer_account_id": None,
+                    "deleted": False,
+                }
+                for n in range(2)
+            ]
+        transactions.append(
+            {
+                "id": f"{i:08x}-0000-0000-0000-000000000000",
+                "date": day,
+                "amount": -rng.randrange(1, 500000),
+                "memo": memo,
+                "cleared": "cleared",
+                "approved": True,
+                "flag_color": None,
+                "account_id": account_id,
+                "account_name": account_name,
+                "payee_id": payee_id,
+                "payee_name": payee_name,
+                "category_id": category_id,
+                "category_name": category_name,
+                "transfer_account_id": None,
+                "transfer_transaction_id": None,
+                "matched_transaction_id": None,
+                "import_id": None,
+                "deleted": False,
+                "subtransactions": subtransactions,
+            }
+        )
+    return json.dumps({"data": {"transactions": transactions, "server_knowledge": size}})
+
+
+def measure(build):
+    """(retained bytes, peak bytes) of whatever build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model memory benchmark")
+    parser.add_argument("--transactions", type=int, default=50000)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.transactions)
+
+    def build_transactions():
+        items = json.loads(payload)["data"]["transactions"]
+        return [Transaction(**item) for item in items]
+
+    transactions, retained, peak = measure(build_transactions)
+    print(f"{len(transactions)} transactions")
+    print(f"  models retained: {retained / 2**20:8.1f} MiB ({retained / len(transactions):.0f} B each)")
+    print(f"  decode peak:     {peak / 2**20:8.1f} MiB")
+
+    def build_payloads():
+        return [
+            CreateTransactionInterface(
+                account_id=transaction.account_id,
+                date=transaction.date,
+                amount=transaction.amount,
+                category_id=transaction.category_id,
+                payee_name=transaction.payee_name,
+                memo=transaction.memo,
+                cleared="cleared",
+                approved=True,
+                flag_color=transaction.flag_color,
+            )
+            for transaction in transactions
+        ]
+
+    payloads, retained, _ = measure(build_payloads)
+    print(f"{len(payloads)} create payloads")
+    print(f"  retained:        {retained / 2**20:8.1f} MiB ({retained / len(payloads):.0f} B each)")
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"max RSS:           {max_rss / 1024:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -74,7 +74,7 @@ def get_bob_categories() -> list[dict]:
     from services._ynab_connection import YNABClient
 
     load_dotenv()
-    client = YNABClient()
+    client = YNABClient.shared()
     budgets = client.get_budgets()
     bob = next((b for b in budgets if b.name == "BOB Budget"), None)
     if not bob:
@@ -2,8 +2,10 @@
 # and print the result
 
 import argparse
-from tasks.sync_transactions import sync_transactions
+from tasks.sync_transactions import default_since_date, sync_transactions
+from tasks.revalue_transactions import revalue_transactions
 from tasks.sync_categories import sync_categories
+from services._ynab_connection import YNABClient
 
 from dotenv import load_dotenv
 
@@ -19,10 +21,66 @@ if __name__ == "__main__":
     parser.add_argument(
         "--since-date",
         type=str,
-        required=True,
-        help="Start date for syncing transactions (format: YYYY-MM-DD)",
+        default=None,
+        help=(
+            "Start date for syncing transactions (format: YYYY-MM-DD). "
+            "Required on the first run; later ones default to the last "
+            "completed sync, less YNAB_SYNC_LOOKBACK_DAYS (7)"
+        ),
+    )
+    parser.add_argument(
+        "--hydration",
+        choices=["endpoints", "budget"],
+        default="endpoints",
+        help=(
+            "How budgets are loaded: per endpoint (categories + transactions) "
+            "or with one full budget export request each"
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["iterative", "columnar"],
+        default="iterative",
+        help=(
+            "How new transactions are computed: one by one, or as pandas "
+            "columns (faster for large backfills, same result)"
+        ),
+    )
+    parser.add_argument(
+        "--revalue",
+        action="store_true",
+        help=(
+            "Recompute USD amounts of already mirrored transactions between "
+            "--since-date and --until-date with the current exchange rates"
+        ),
+    )
+    parser.add_argument(
+        "--until-date",
+        type=str,
+        default=None,
+        help="End date for --revalue (format: YYYY-MM-DD)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --revalue, only print what would change",
     )
     args = parser.parse_args()
 
-    sync_transactions(only_credit_card=args.credit_card, since_date=args.since_date)
+    if args.revalue:
+        revalue_transactions(
+            since_date=args.since_date,
+            until_date=args.until_date,
+            dry_run=args.dry_run,
+        )
+    else:
+        if not (args.since_date or default_since_date(args.credit_card)):
+            parser.error("--since-date is required until a first sync has completed")
+        sync_transactions(
+            only_credit_card=args.credit_card,
+            since_date=args.since_date,
+            hydration=args.hydration,
+            engine=args.engine,
+        )
+    print(f"YNAB requests left this hour: {YNABClient.shared().rate_limit_remaining()}")
     # sync_categories()
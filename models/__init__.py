@@ -1,4 +1,7 @@
+from .dates import date_ordinal
 from .transaction import Transaction
 from .transaction import Subtransaction
+from .transaction import LazyTransaction
 from .category import Category
+from .transaction_index import TransactionIndex
 from .budget import Budget
@@ -1,7 +1,20 @@
 from models import Category, Transaction
 
+from .transaction_index import TransactionIndex
+
 
 class CurrencyFormat:
+    __slots__ = (
+        "iso_code",
+        "example_format",
+        "decimal_digits",
+        "decimal_separator",
+        "symbol_first",
+        "group_separator",
+        "currency_symbol",
+        "display_symbol",
+    )
+
     def __init__(
         self,
         iso_code,
@@ -25,39 +38,55 @@ class CurrencyFormat:
 
 
 class Budget:
-    def __init__(self, id, name, last_modified_on, currency_format, **ignored):
+    __slots__ = (
+        "id",
+        "name",
+        "last_modified_on",
+        "currency_format",
+        "accounts",
+        "categories",
+        "uncategorized_transactions",
+        "transaction_index",
+        "_transactions",
+    )
+
+    def __init__(
+        self, id, name, last_modified_on, currency_format, accounts=None, **ignored
+    ):
         self.id = id
         self.name = name
         self.last_modified_on = last_modified_on
         self.currency_format = CurrencyFormat(**currency_format)
+        self.accounts: [dict] = accounts or []
         self.categories: [Category] = []
         self.uncategorized_transactions: [Transaction] = []
+        self.transaction_index = TransactionIndex()
+        self._transactions = None
 
     @property
     def transactions(self):
-        return [
-            transaction
-            for category in self.categories
-            for transaction in category.transactions
-        ] + self.uncategorized_transactions
+        """Every transaction, category by category (uncategorized ones last)"""
+        if self._transactions is None:
+            self._transactions = [
+                transaction
+                for category in self.categories
+                for transaction in category.transactions
+            ] + self.uncategorized_transactions
+        return self._transactions
 
     def assign_categories(self, categories):
         self.categories = [
             category if isinstance(category, Category) else Category(**category)
             for category in categories
         ]
+        self.transaction_index = TransactionIndex(self.categories)
+        self._transactions = None
         return self
 
     def assign_transactions(self, transactions):
+        self._transactions = None
         for transaction in transactions:
-            category = next(
-                (
-                    category
-                    for category in self.categories
-                    if category.id == transaction.category_id
-                ),
-                None,
-            )
+            category = self.transaction_index.add(transaction)
             if category:
                 category.transactions.append(transaction)
             else:
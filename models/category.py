@@ -1,7 +1,23 @@
 from models import Transaction
 
+from .interning import intern_str
+
 
 class Category:
+    __slots__ = (
+        "id",
+        "category_group_id",
+        "category_group_name",
+        "name",
+        "hidden",
+        "note",
+        "budgeted",
+        "activity",
+        "balance",
+        "deleted",
+        "transactions",
+    )
+
     def __init__(
         self,
         id,
@@ -16,10 +32,10 @@ class Category:
         deleted,
         **ignored,
     ):
-        self.id = id
-        self.category_group_id = category_group_id
-        self.category_group_name = category_group_name
-        self.name: str = name
+        self.id = intern_str(id)
+        self.category_group_id = intern_str(category_group_id)
+        self.category_group_name = intern_str(category_group_name)
+        self.name: str = intern_str(name)
         self.hidden = hidden
         self.note = note
         self.budgeted = budgeted
@@ -38,3 +54,6 @@ class Category:
         if not isinstance(o, Category):
             return False
         return self.id == o.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
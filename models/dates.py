@@ -0,0 +1,12 @@
+from datetime import date
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def date_ordinal(iso_date: str) -> int:
+    """
+    Day number (`date.toordinal()`) of a YYYY-MM-DD date, so dates compare,
+    sort and bisect as plain ints. Budgets repeat the same few thousand
+    dates, hence the cache.
+    """
+    return date.fromisoformat(iso_date).toordinal()
@@ -0,0 +1,10 @@
+import sys
+
+
+def intern_str(value):
+    """
+    Interned copy of a string, so the ids, names and dates repeated across
+    thousands of decoded transactions are stored once. Anything else
+    (None, numbers) is returned as is.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
@@ -1,7 +1,31 @@
 import re
 
+from .dates import date_ordinal
+from .interning import intern_str
+
+EXCHANGE_RATE_PATTERN = re.compile(r"\[TC:(\d+(?:\.\d+)?)\]")
+
+_UNSET = object()
+
 
 class _BaseTransaction:
+    __slots__ = (
+        "id",
+        "_date",
+        "date_ordinal",
+        "account_id",
+        "amount",
+        "_memo",
+        "payee_id",
+        "payee_name",
+        "category_id",
+        "category_name",
+        # Derived values, computed on first access
+        "_identifier",
+        "_memo_identifier",
+        "_exchange_rate",
+    )
+
     def __init__(
         self,
         id,
@@ -17,13 +41,34 @@ class _BaseTransaction:
     ):
         self.id = id
         self.date = date
-        self.account_id = account_id
+        self.account_id = intern_str(account_id)
         self.amount = amount
         self.memo = memo
-        self.payee_id = payee_id
-        self.payee_name = payee_name
-        self.category_id = category_id
-        self.category_name = category_name
+        self.payee_id = intern_str(payee_id)
+        self.payee_name = intern_str(payee_name)
+        self.category_id = intern_str(category_id)
+        self.category_name = intern_str(category_name)
+
+    @property
+    def date(self) -> str:
+        """YYYY-MM-DD, as YNAB sends it (`date_ordinal` is the same day as an int)"""
+        return self._date
+
+    @date.setter
+    def date(self, value):
+        self._date = intern_str(value)
+        self.date_ordinal = date_ordinal(value)
+        self._identifier = None
+
+    @property
+    def memo(self):
+        return self._memo
+
+    @memo.setter
+    def memo(self, value):
+        self._memo = value
+        self._memo_identifier = _UNSET
+        self._exchange_rate = _UNSET
 
     @property
     def identifier(self) -> str:
@@ -32,11 +77,17 @@ class _BaseTransaction:
         `abcd1234-1008` that indicates the transaction (on other budget) that
         this transaction represents
         """
-        return "{}|{}".format(self.id[:8], "".join(self.date.split("-")[1:]))
+        if self._identifier is None:
+            self._identifier = "{}|{}{}".format(
+                self.id[:8], self._date[5:7], self._date[8:10]
+            )
+        return self._identifier
 
     @property
     def memo_identifier(self) -> str:
-        return self.memo and self.memo.strip()[-13:]
+        if self._memo_identifier is _UNSET:
+            self._memo_identifier = self._memo and self._memo.strip()[-13:]
+        return self._memo_identifier
 
     @property
     def exchange_rate(self) -> float:
@@ -44,27 +95,40 @@ class _BaseTransaction:
         Look for something like
         memo = "[TC:555.02] some random memo"
         """
-        if self.memo and "[TC:" in self.memo:
-            match = re.search(r"\[TC:(\d+(?:\.\d+)?)\]", self.memo)
-            if match:
-                return float(match.group(1))
-        return None
+        if self._exchange_rate is _UNSET:
+            self._exchange_rate = None
+            if self._memo and "[TC:" in self._memo:
+                match = EXCHANGE_RATE_PATTERN.search(self._memo)
+                if match:
+                    self._exchange_rate = float(match.group(1))
+        return self._exchange_rate
 
     def __eq__(self, _value: object) -> bool:
         if not issubclass(_value.__class__, _BaseTransaction):
             return False
+        return self.id == _value.id
 
-        return (
-            self.identifier == _value.memo_identifier
-            or self.memo_identifier == _value.identifier
-        )
+    def __hash__(self) -> int:
+        return hash(self.id)
 
 
 class Subtransaction(_BaseTransaction):
-    pass
+    __slots__ = ()
 
 
 class Transaction(_BaseTransaction):
+    __slots__ = (
+        "cleared",
+        "approved",
+        "flag_color",
+        "account_name",
+        "transfer_account_id",
+        "transfer_transaction_id",
+        "matched_transaction_id",
+        "deleted",
+        "subtransactions",
+    )
+
     def __init__(
         self,
         cleared,
@@ -79,11 +143,11 @@ class Transaction(_BaseTransaction):
         **kwargs,
     ):
         super().__init__(**kwargs)
-        self.cleared = cleared
+        self.cleared = intern_str(cleared)
         self.approved = approved
-        self.flag_color = flag_color
-        self.account_name = account_name
-        self.transfer_account_id = transfer_account_id
+        self.flag_color = intern_str(flag_color)
+        self.account_name = intern_str(account_name)
+        self.transfer_account_id = intern_str(transfer_account_id)
         self.transfer_transaction_id = transfer_transaction_id
         self.matched_transaction_id = matched_transaction_id
         self.deleted = deleted
@@ -96,3 +160,63 @@ class Transaction(_BaseTransaction):
 
     def __str__(self):
         return f"{self.date} {self.category_name} {self.amount}"
+
+
+class LazyTransaction(Transaction):
+    """
+    Transaction over its raw API dict that is only built when needed
+
+    The fields filters look at are read straight off the dict; touching
+    anything else (dates, memo, identifiers, subtransactions of a split)
+    builds the whole transaction once, in place, and the dict is dropped.
+    Transactions that get filtered out early are never built.
+    """
+
+    __slots__ = ("_raw",)
+
+    RAW_FIELDS = frozenset(
+        (
+            "id",
+            "account_id",
+            "category_id",
+            "category_name",
+            "payee_name",
+            "amount",
+            "flag_color",
+            "deleted",
+        )
+    )
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def _build(self):
+        raw, self._raw = self._raw, None
+        Transaction.__init__(self, **raw)
+
+    def __getattr__(self, name):
+        # Only reached for slots not set yet, so for unbuilt transactions
+        raw = self._raw
+        if raw is None:
+            raise AttributeError(name)
+        if name in self.RAW_FIELDS:
+            return raw[name]
+        if name == "subtransactions" and not raw["subtransactions"]:
+            return []
+
+        self._build()
+        return getattr(self, name)
+
+    # Setting memo or date builds first, or building later would overwrite
+    # the new value (other fields aren't meant to be reassigned)
+    @Transaction.memo.setter
+    def memo(self, value):
+        if self._raw is not None:
+            self._build()
+        Transaction.memo.fset(self, value)
+
+    @Transaction.date.setter
+    def date(self, value):
+        if self._raw is not None:
+            self._build()
+        Transaction.date.fset(self, value)
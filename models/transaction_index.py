@@ -0,0 +1,82 @@
+from bisect import bisect_left, bisect_right
+
+from .dates import date_ordinal
+
+_ALL = object()  # Every account
+
+
+class TransactionIndex:
+    """
+    Lookups over the transactions of a budget, kept up to date as they are
+    added: by id, by account, by `identifier` (subtransactions included)
+    and by date. The identifier and date ordered views are built on first
+    use after a change (so lazy transactions aren't built just to be
+    indexed); dates are sliced with bisect.
+    """
+
+    __slots__ = (
+        "_categories",
+        "_by_id",
+        "_by_account",
+        "_by_identifier",
+        "_by_date",
+    )
+
+    def __init__(self, categories=()):
+        self._categories = {}
+        for category in categories:
+            self._categories.setdefault(category.id, category)
+        self._by_id = {}
+        self._by_account = {}
+        self._by_identifier = None
+        # account_id (or _ALL) -> (date ordinals, transactions), date sorted
+        self._by_date = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add(self, transaction):
+        """Index a transaction, returns the category it belongs to (or None)"""
+        category = self._categories.get(transaction.category_id)
+        self._by_id[transaction.id] = transaction
+        self._by_account.setdefault(transaction.account_id, []).append(transaction)
+        self._by_identifier = None
+        self._by_date.clear()
+        return category
+
+    def by_identifier(self, identifier):
+        """Transaction or subtransaction whose `identifier` is the given one"""
+        if self._by_identifier is None:
+            self._by_identifier = {
+                source.identifier: source
+                for transaction in self._by_id.values()
+                for source in [transaction, *transaction.subtransactions]
+            }
+        return self._by_identifier.get(identifier)
+
+    def by_account(self, account_id):
+        """Transactions of an account, oldest first"""
+        return self._sorted(account_id)[1]
+
+    def between(self, since_date=None, until_date=None, account_id=_ALL):
+        """Transactions dated within [since_date, until_date], oldest first
+
+        Either bound may be None; `account_id` narrows it to one account.
+        """
+        days, transactions = self._sorted(account_id)
+        start = bisect_left(days, date_ordinal(since_date)) if since_date else 0
+        end = bisect_right(days, date_ordinal(until_date)) if until_date else len(days)
+        return transactions[start:end]
+
+    def _sorted(self, account_id):
+        entry = self._by_date.get(account_id)
+        if entry is None:
+            transactions = (
+                self._by_id.values()
+                if account_id is _ALL
+                else self._by_account.get(account_id, [])
+            )
+            transactions = sorted(transactions, key=lambda t: t.date_ordinal)
+            entry = ([t.date_ordinal for t in transactions], transactions)
+            self._by_date[account_id] = entry
+        return entry
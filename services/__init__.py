@@ -1,6 +1,13 @@
 from .budget_provider import (
     relevant_budgets,
+    relevant_budgets_async,
     fill_transactions,
+    fill_transactions_async,
+    hydrate_budgets,
+    hydrate_budgets_async,
 )
 
-from .transaction_provider import sync_transactions_to_main_budget
+from .transaction_provider import (
+    sync_transactions_to_main_budget,
+    revalue_mirrored_transactions,
+)
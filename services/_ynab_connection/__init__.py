@@ -1,2 +1,8 @@
 from .api_client import YNABClient
+from .async_api_client import AsyncYNABClient
 from .create_transaction_interface import CreateTransactionInterface
+from .mirror_index import MirrorIndex
+from .rate_limiter import RateLimiter
+from .rate_timeline import RateTimeline
+from .cassette import Cassette, CassetteMiss
+from .category_index import CategoryIndex
@@ -1,99 +1,562 @@
+import json
+import mmap
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from itertools import islice
 from os import environ as env
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from models import Budget, Category, Transaction
+from models import Budget, Category, LazyTransaction
+
+from . import budget_export, decoding
+from .cassette import Cassette
+from .instrumentation import RequestLog
+from .json_stream import JSONArrayStream
+from .local_store import LocalStore
+from .metadata_cache import MetadataCache
+from .rate_limiter import RateLimiter
+from .single_flight import SingleFlight
 
 
 class YNABClient:
     API_URL = "https://api.youneedabudget.com/v1"
 
-    def __init__(self):
+    POOL_SIZE = 10
+    TIMEOUT = (5, 30)  # (connect, read) seconds
+    MAX_RETRIES = 4
+    BACKOFF_FACTOR = 1.0
+    MAX_BACKOFF = 60
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "PUT", "PATCH", "DELETE")
+
+    STREAMED_ENDPOINTS = ("transactions", "accounts")
+    STREAM_CHUNK_SIZE = 64 * 1024
+    STREAM_BATCH_SIZE = 1000
+    LOW_MEMORY_BATCH_SIZE = 100
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, low_memory=None, fast_decode=None):
+        """
+        Args:
+            low_memory: Keep as little as possible in memory (smaller write
+                batches, transactions decoded lazily off the local store).
+                Defaults to the `YNAB_LOW_MEMORY` env var.
+            fast_decode: Decode delta responses and stored transactions and
+                categories into typed dicts with msgspec, when installed. On
+                unless the `YNAB_FAST_DECODE` env var turns it off.
+        """
+        if low_memory is None:
+            low_memory = env.get("YNAB_LOW_MEMORY", "").lower() in ("1", "true", "yes")
+        if fast_decode is None:
+            fast_decode = env.get("YNAB_FAST_DECODE", "on").lower() not in (
+                "0",
+                "off",
+                "false",
+            )
+        self.low_memory = low_memory
+        self.decode_transaction, self.decode_category = decoding.decoders(fast_decode)
+        self.decode_delta = decoding.delta_decoder(fast_decode)
         self.headers = {
             "Authorization": f"Bearer {env.get('YNAB_TOKEN')}",
         }
+        self.session = self._build_session()
+        self.local_store = LocalStore()
+        self.rate_limiter = RateLimiter()
+        self.metadata_cache = MetadataCache()
+        self.request_log = RequestLog()
+        self.cassette = Cassette.from_env(env)
+        self.single_flight = SingleFlight()
+
+    @classmethod
+    def shared(cls):
+        """Process-wide client, so every caller reuses the same connection pool"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
 
-    def get_budgets(self):
-        """Get a list of budgets"""
-        url = f"{self.API_URL}/budgets"
-        response = requests.get(
-            url,
-            headers=self.headers,
+    def _build_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.POOL_SIZE,
+            pool_block=True,
         )
+        session.mount("https://", adapter)
+        return session
+
+    def _request(self, method, path, timeout=None, priority=None, **kwargs):
+        """Send a request through the pooled session, retrying on 429/5xx
+
+        Only idempotent methods are retried on server errors and dropped
+        connections; a 429 is always safe to retry since YNAB rejected it
+        before doing any work. Every attempt goes through the shared rate
+        limiter; writes default to high priority and reads to normal.
+
+        Each call leaves one record in the request log. Streamed responses
+        get theirs in `response.request_record`, to be finished once the
+        body has been read.
+        """
+        url = f"{self.API_URL}{path}"
+        retryable = method in self.IDEMPOTENT_METHODS
+        if priority is None:
+            priority = (
+                RateLimiter.PRIORITY_NORMAL
+                if method == "GET"
+                else RateLimiter.PRIORITY_HIGH
+            )
+
+        record = self.request_log.start(method, path)
+        for attempt in range(self.MAX_RETRIES + 1):
+            last_attempt = attempt == self.MAX_RETRIES
+            record["retries"] = attempt
+            if not (self.cassette and self.cassette.replaying):
+                self.rate_limiter.acquire(priority)
+            try:
+                response = self._send(method, url, timeout or self.TIMEOUT, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if not retryable or last_attempt:
+                    self.request_log.finish(record, error=error)
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if "X-Rate-Limit" in response.headers:
+                self.rate_limiter.update(response.headers["X-Rate-Limit"])
+            if response.status_code == 429:
+                self.rate_limiter.exhaust()
+
+            if (
+                last_attempt
+                or response.status_code not in self.RETRY_STATUSES
+                or (response.status_code != 429 and not retryable)
+            ):
+                if kwargs.get("stream"):
+                    response.request_record = record
+                else:
+                    self.request_log.finish(record, response, len(response.content))
+                return response
+
+            # Hand the connection back to the pool; an unread streamed body
+            # would hold it for the whole sleep
+            response.close()
+            time.sleep(self._retry_delay(response, attempt))
+
+    def _send(self, method, url, timeout, **kwargs):
+        if self.cassette:
+            return self.cassette.request(
+                self.session, method, url, timeout=timeout, **kwargs
+            )
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def _backoff(self, attempt):
+        return min(self.BACKOFF_FACTOR * 2**attempt, self.MAX_BACKOFF)
+
+    def _retry_delay(self, response, attempt):
+        """Honor Retry-After (seconds or HTTP date) before falling back to backoff"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0), self.MAX_BACKOFF)
+        return self._backoff(attempt)
+
+    def rate_limit_remaining(self):
+        """Requests left in the shared hourly YNAB budget"""
+        return self.rate_limiter.remaining()
+
+    def get_budgets(self, priority=None, cached=True, include_accounts=False):
+        """Get a list of budgets
+
+        With `cached` a list younger than the metadata TTL is reused. With
+        `include_accounts` every budget comes with its accounts in
+        `Budget.accounts`, out of the same request, and they are cached for
+        `get_accounts` too. Cached account balances may be stale, so pass
+        `cached=False` to read balances.
+        """
+        budgets = self.metadata_cache.get("budgets") if cached else None
+        if budgets and include_accounts and "accounts" not in budgets[0]:
+            budgets = None  # Cached without accounts
+        if budgets is None:
+            budgets = self.single_flight.do(
+                ("GET", "/budgets", include_accounts),
+                lambda: self._fetch_budgets(priority, include_accounts),
+            )
+
+        return [Budget(**budget) for budget in budgets]
+
+    def _fetch_budgets(self, priority, include_accounts):
+        params = {"include_accounts": "true"} if include_accounts else {}
+        response = self._request("GET", "/budgets", params=params, priority=priority)
         data = response.json()
 
-        return [Budget(**budget) for budget in data["data"]["budgets"]]
+        budgets = data["data"]["budgets"]
+        self.metadata_cache.set("budgets", budgets)
+        if include_accounts:
+            for budget in budgets:
+                self.metadata_cache.set(f"accounts:{budget['id']}", budget["accounts"])
+        return budgets
 
-    def get_categories(self, budget_id):
+    def get_categories(self, budget_id, use_stored=False, cached=True):
         """Get a list of categories given a budget"""
-        url = f"{self.API_URL}/budgets/{budget_id}/categories"
-        response = requests.get(
-            url,
-            headers=self.headers,
+        key = f"categories:{budget_id}"
+        categories = self.metadata_cache.get(key) if cached else None
+        if categories is None:
+            self.refresh(budget_id, "categories", use_stored=use_stored)
+            categories = self.local_store.categories(
+                budget_id, decode=self.decode_category
+            )
+            self.metadata_cache.set(key, categories)
+
+        return [Category(**category) for category in categories]
+
+    def get_transactions(self, budget_id, since_date=None, use_stored=False):
+        """Get a list of all transactions of a budget
+
+        In low memory mode this is a generator reading from the local store.
+        Transactions are built lazily, on first use of anything but the raw
+        fields filters need.
+        """
+        self.refresh(budget_id, "transactions", since_date, use_stored=use_stored)
+
+        transactions = (
+            LazyTransaction(transaction)
+            for transaction in self.local_store.iter_transactions(
+                budget_id, since_date, decode=self.decode_transaction
+            )
         )
+        return transactions if self.low_memory else list(transactions)
+
+    def refresh_budget(self, budget_id, use_stored=False):
+        """
+        Bring accounts, payees, categories and transactions of a budget up to
+        date in the local store with a single `/budgets/{id}` request (a delta
+        after the first one)
+        """
+        self.single_flight.do(
+            ("budget", budget_id, use_stored),
+            lambda: self._refresh_budget(budget_id, use_stored),
+        )
+
+    def _refresh_budget(self, budget_id, use_stored):
+        endpoint = LocalStore.BUDGET_ENDPOINT
+        state = self.local_store.sync_state(budget_id, endpoint)
+        if state and use_stored:
+            return
+
+        params = {"last_knowledge_of_server": state[0]} if state else {}
+        response = self._request("GET", f"/budgets/{budget_id}", params=params)
         data = response.json()
 
+        if response.status_code != 200:
+            raise Exception(data["error"]["detail"])
+
+        budget = data["data"]["budget"]
+        reset = state is None
+        store = self.local_store
+        store.apply_delta(budget_id, "accounts", budget["accounts"], reset=reset)
+        store.apply_delta(budget_id, "payees", budget["payees"], reset=reset)
+        store.apply_delta(
+            budget_id, "categories", budget_export.categories(budget), reset=reset
+        )
+
+        touched = {summary["id"] for summary in budget["transactions"]} | {
+            subtransaction["transaction_id"]
+            for subtransaction in budget["subtransactions"]
+        }
+        stored = {} if reset else {
+            transaction["id"]: transaction
+            for transaction in store.transactions_by_id(budget_id, touched)
+        }
+        transactions = budget_export.transactions(
+            budget,
+            accounts={account["id"]: account for account in store.accounts(budget_id)},
+            payees={payee["id"]: payee for payee in store.payees(budget_id)},
+            categories={
+                category["id"]: category for category in store.categories(budget_id)
+            },
+            stored=stored,
+        )
+        store.apply_delta(budget_id, "transactions", transactions, reset=reset)
+
+        store.save_sync_state(
+            budget_id, endpoint, data["data"]["server_knowledge"], None
+        )
+
+    def stored_categories(self, budget_id):
+        """Categories of a budget as they are in the local store, no request"""
         return [
             Category(**category)
-            for category_group in data["data"]["category_groups"]
-            for category in category_group["categories"]
+            for category in self.local_store.categories(
+                budget_id, decode=self.decode_category
+            )
+        ]
+
+    def stored_transactions(self, budget_id, since_date=None):
+        """Transactions of a budget as they are in the local store, no request"""
+        return [
+            LazyTransaction(transaction)
+            for transaction in self.local_store.iter_transactions(
+                budget_id, since_date, decode=self.decode_transaction
+            )
         ]
 
-    def get_transactions(self, budget_id, since_date=None):
-        """Get a list of all transactions of a budget"""
-        url = f"{self.API_URL}/budgets/{budget_id}/transactions"
+    def budget_unchanged(self, budget):
+        """True if the budget wasn't modified since its data was last synced"""
+        return (
+            budget.last_modified_on is not None
+            and self.local_store.synced_last_modified_on(budget.id)
+            == budget.last_modified_on
+        )
+
+    def mark_budget_synced(self, budget):
+        if budget.last_modified_on is not None:
+            self.local_store.mark_budget_synced(budget.id, budget.last_modified_on)
+
+    def last_sync_date(self, name):
+        """Date the named sync last completed on, as kept in the local store"""
+        return self.local_store.last_run_date(name)
+
+    def mark_synced(self, name, date):
+        self.local_store.save_run_date(name, date)
+
+    def get_last_transaction_date(self, budget_id, account_id):
+        """Most recent transaction date of an account, straight from the local store"""
+        self.refresh(budget_id, "transactions")
+        return self.local_store.last_transaction_date(budget_id, account_id)
+
+    def refresh(
+        self, budget_id, endpoint, since_date=None, priority=None, use_stored=False
+    ):
+        """
+        Bring the local store copy of an endpoint up to date
+
+        The first request downloads everything (from `since_date` on, when
+        given); later ones send `last_knowledge_of_server` so YNAB only
+        returns what was created, changed or deleted in between. With
+        `use_stored` no request is made at all if the store already has it.
+
+        Concurrent refreshes of the same endpoint share one request: callers
+        arriving while it is in flight wait for it instead of sending their
+        own.
+        """
+        self.single_flight.do(
+            (budget_id, endpoint, since_date, use_stored),
+            lambda: self._refresh(budget_id, endpoint, since_date, priority, use_stored),
+        )
+
+    def _refresh(self, budget_id, endpoint, since_date, priority, use_stored):
+        state = self.local_store.sync_state(budget_id, endpoint)
+        if state and not self._covers(state[1], since_date):
+            state = None  # Stored history starts after the requested date
+        if state and use_stored:
+            return
+
+        params = {}
+        if state:
+            server_knowledge, since_date = state
+            params["last_knowledge_of_server"] = server_knowledge
         if since_date:
-            url += f"?since_date={since_date}"
-        response = requests.get(
-            url,
-            headers=self.headers,
+            params["since_date"] = since_date
+
+        reset = state is None
+        if endpoint in self.STREAMED_ENDPOINTS:
+            self._stream_delta(budget_id, endpoint, params, priority, reset, since_date)
+            return
+
+        response = self._request(
+            "GET", f"/budgets/{budget_id}/{endpoint}", params=params, priority=priority
         )
-        data = response.json()
+        if response.status_code != 200:
+            raise Exception(response.json()["error"]["detail"])
 
-        return [
-            Transaction(**transaction) for transaction in data["data"]["transactions"]
-        ]
+        if self.decode_delta and endpoint in decoding.DELTA_ENDPOINTS:
+            rows, server_knowledge = self.decode_delta(endpoint, response.content)
+        else:
+            data = response.json()["data"]
+            rows = self._encoded(self._delta_items(endpoint, data))
+            server_knowledge = data["server_knowledge"]
+
+        with self.local_store.transaction():
+            self._apply_rows(budget_id, endpoint, rows, reset)
+            self.local_store.save_sync_state(
+                budget_id, endpoint, server_knowledge, since_date
+            )
+
+    def _stream_delta(self, budget_id, endpoint, params, priority, reset, since_date):
+        """
+        Spool a (possibly huge) response to a temporary file, then decode its
+        items from there and write them to the local store in batches, so
+        neither the whole body nor the whole item list is ever held in memory.
+
+        The download holds no lock. The reset, the items and the new
+        knowledge go in afterwards as one short transaction, which a response
+        without server_knowledge rolls back entirely.
+        """
+        response = self._request(
+            "GET",
+            f"/budgets/{budget_id}/{endpoint}",
+            params=params,
+            priority=priority,
+            stream=True,
+        )
+        if response.status_code != 200:
+            self.request_log.finish(
+                response.request_record, response, len(response.content)
+            )
+            raise Exception(response.json()["error"]["detail"])
 
-    def create_transaction(self, budget_id, transaction_data):
-        """Create a new transaction in a budget"""
-        url = f"{self.API_URL}/budgets/{budget_id}/transactions"
-        response = requests.post(
-            url,
-            headers=self.headers,
+        with tempfile.TemporaryFile() as spool:
+            size = 0
+            with response:
+                for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                    size += len(chunk)
+                    spool.write(chunk)
+            self.request_log.finish(response.request_record, response, size)
+
+            stream = None
+            if self.decode_delta:
+                # msgspec wants the body as one buffer: map the spool rather
+                # than reading it in. The map closes once its rows are gone.
+                spool.flush()
+                body = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+                rows, server_knowledge = self.decode_delta(endpoint, body)
+            else:
+                spool.seek(0)
+                stream = JSONArrayStream(endpoint)
+                chunks = iter(lambda: spool.read(self.STREAM_CHUNK_SIZE), b"")
+                rows = self._encoded(stream.items(chunks))
+
+            with self.local_store.transaction():
+                self._apply_rows(budget_id, endpoint, rows, reset)
+                if stream is not None:
+                    server_knowledge = stream.int_field("server_knowledge")
+                if server_knowledge is None:
+                    raise Exception(f"YNAB {endpoint} response has no server_knowledge")
+                self.local_store.save_sync_state(
+                    budget_id, endpoint, server_knowledge, since_date
+                )
+
+    def _apply_rows(self, budget_id, endpoint, rows, reset):
+        batch_size = (
+            self.LOW_MEMORY_BATCH_SIZE if self.low_memory else self.STREAM_BATCH_SIZE
+        )
+        while batch := list(islice(rows, batch_size)):
+            self.local_store.apply_rows(budget_id, endpoint, batch, reset=reset)
+            reset = False
+        if reset:
+            self.local_store.apply_rows(budget_id, endpoint, [], reset=True)
+
+    @staticmethod
+    def _encoded(items):
+        return ((item, json.dumps(item)) for item in items)
+
+    @staticmethod
+    def _covers(stored_since_date, since_date):
+        if stored_since_date is None:
+            return True
+        return since_date is not None and stored_since_date <= since_date
+
+    @staticmethod
+    def _delta_items(endpoint, data):
+        if endpoint == "categories":
+            return [
+                category
+                for category_group in data["category_groups"]
+                for category in category_group["categories"]
+            ]
+        return data[endpoint]
+
+    def create_transactions(self, budget_id, transactions_data):
+        """Create several transactions in a budget with a single request
+
+        Returns the created transactions, in the same order they were sent.
+        """
+        response = self._request(
+            "POST",
+            f"/budgets/{budget_id}/transactions",
             json={
-                "transaction": {
-                    "account_id": transaction_data["account_id"],
-                    "date": transaction_data["date"],
-                    "amount": transaction_data["amount"],
-                    "payee_name": transaction_data["payee_name"],
-                    "category_id": transaction_data["category_id"],
-                    "memo": transaction_data["memo"],
-                    "cleared": "cleared",
-                    "approved": True,
-                    "flag_color": transaction_data["flag_color"],
-                }
+                "transactions": [
+                    self._transaction_payload(transaction_data)
+                    for transaction_data in transactions_data
+                ]
             },
         )
         data = response.json()
 
         if response.status_code != 201:
             raise Exception(data["error"]["detail"])
-        else:
-            print(f"Created transaction {data['data']['transaction']['id']}")
 
-    def get_accounts(self, budget_id):
-        """Get a list of accounts for a budget."""
-        url = f"{self.API_URL}/budgets/{budget_id}/accounts"
-        response = requests.get(url, headers=self.headers)
+        self.invalidate_metadata(budget_id)
+        return data["data"]["transactions"]
+
+    def update_transactions(self, budget_id, transactions_data):
+        """Update several existing transactions (each dict carries its id) at once"""
+        response = self._request(
+            "PATCH",
+            f"/budgets/{budget_id}/transactions",
+            json={"transactions": transactions_data},
+        )
         data = response.json()
-        return data["data"]["accounts"]
+
+        if response.status_code != 209:
+            raise Exception(data["error"]["detail"])
+
+        self.invalidate_metadata(budget_id)
+        return data["data"]["transactions"]
+
+    @staticmethod
+    def _transaction_payload(transaction_data):
+        return {
+            "account_id": transaction_data["account_id"],
+            "date": transaction_data["date"],
+            "amount": transaction_data["amount"],
+            "payee_name": transaction_data["payee_name"],
+            "category_id": transaction_data["category_id"],
+            "memo": transaction_data["memo"],
+            "cleared": "cleared",
+            "approved": True,
+            "flag_color": transaction_data["flag_color"],
+        }
+
+    def get_accounts(self, budget_id, priority=None, cached=True):
+        """Get a list of accounts for a budget."""
+        key = f"accounts:{budget_id}"
+        accounts = self.metadata_cache.get(key) if cached else None
+        if accounts is None:
+            self.refresh(budget_id, "accounts", priority=priority)
+            accounts = self.local_store.accounts(budget_id)
+            self.metadata_cache.set(key, accounts)
+        return accounts
+
+    def invalidate_metadata(self, budget_id=None):
+        """Forget cached metadata, of one budget (plus the budget list) or all"""
+        if budget_id is None:
+            self.metadata_cache.invalidate()
+            return
+        self.metadata_cache.invalidate("budgets")
+        self.metadata_cache.invalidate(f"accounts:{budget_id}")
+        self.metadata_cache.invalidate(f"categories:{budget_id}")
 
     def import_transactions(self, budget_id, transactions):
         """Bulk create transactions with import_id dedup."""
-        url = f"{self.API_URL}/budgets/{budget_id}/transactions"
-        response = requests.post(
-            url,
-            headers=self.headers,
+        response = self._request(
+            "POST",
+            f"/budgets/{budget_id}/transactions",
             json={"transactions": transactions},
         )
         data = response.json()
@@ -101,4 +564,5 @@ class YNABClient:
         if response.status_code not in (200, 201):
             raise Exception(data["error"]["detail"])
 
+        self.invalidate_metadata(budget_id)
         return data["data"]
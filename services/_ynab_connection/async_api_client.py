@@ -0,0 +1,63 @@
+import asyncio
+
+from .api_client import YNABClient
+
+
+class AsyncYNABClient:
+    """
+    asyncio flavour of YNABClient
+
+    Calls run in worker threads on top of the shared client, so they keep
+    using its connection pool, retries, rate limiter and local store; a
+    semaphore bounds how many of them are in flight at once.
+    """
+
+    MAX_CONCURRENCY = 4
+
+    def __init__(self, client: YNABClient = None, max_concurrency: int = None):
+        self._client = client or YNABClient.shared()
+        self._semaphore = asyncio.Semaphore(max_concurrency or self.MAX_CONCURRENCY)
+
+    async def _call(self, method, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.to_thread(
+                getattr(self._client, method), *args, **kwargs
+            )
+
+    async def get_budgets(self, priority=None, cached=True, include_accounts=False):
+        return await self._call(
+            "get_budgets",
+            priority=priority,
+            cached=cached,
+            include_accounts=include_accounts,
+        )
+
+    async def get_categories(self, budget_id, use_stored=False, cached=True):
+        return await self._call(
+            "get_categories", budget_id, use_stored=use_stored, cached=cached
+        )
+
+    async def get_transactions(self, budget_id, since_date=None, use_stored=False):
+        return await self._call(
+            "get_transactions", budget_id, since_date, use_stored=use_stored
+        )
+
+    async def budget_unchanged(self, budget):
+        return await self._call("budget_unchanged", budget)
+
+    async def mark_budget_synced(self, budget):
+        return await self._call("mark_budget_synced", budget)
+
+    async def get_accounts(self, budget_id, priority=None, cached=True):
+        return await self._call(
+            "get_accounts", budget_id, priority=priority, cached=cached
+        )
+
+    async def refresh_budget(self, budget_id, use_stored=False):
+        return await self._call("refresh_budget", budget_id, use_stored=use_stored)
+
+    async def stored_categories(self, budget_id):
+        return await self._call("stored_categories", budget_id)
+
+    async def stored_transactions(self, budget_id, since_date=None):
+        return await self._call("stored_transactions", budget_id, since_date)
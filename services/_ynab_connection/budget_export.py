@@ -0,0 +1,82 @@
+"""
+Translate the `/budgets/{id}` export payload into the shapes returned by
+the per-endpoint API (`/categories`, `/accounts`, `/transactions`), so the
+local store and the models don't care which one the data came from.
+
+The export lists transactions as summaries without names and with their
+subtransactions apart; names are joined back from accounts, payees and
+categories, and subtransactions are nested under their transaction.
+"""
+
+SPLIT_CATEGORY_NAME = "Split (Multiple Categories)..."
+UNCATEGORIZED_NAME = "Uncategorized"
+
+
+def categories(budget):
+    group_names = {group["id"]: group["name"] for group in budget["category_groups"]}
+    return [
+        {
+            **category,
+            "category_group_name": category.get("category_group_name")
+            or group_names.get(category["category_group_id"]),
+        }
+        for category in budget["categories"]
+    ]
+
+
+def transactions(budget, accounts, payees, categories, stored):
+    """
+    Full transactions out of the export summaries
+
+    Args:
+        budget: `data.budget` of the export (or of its delta)
+        accounts, payees, categories: Every known item of each, by id
+        stored: Already stored transactions that have subtransactions in
+            this payload but weren't changed themselves, by id
+    """
+    account_names = {id: account["name"] for id, account in accounts.items()}
+    payee_names = {id: payee["name"] for id, payee in payees.items()}
+    category_names = {id: category["name"] for id, category in categories.items()}
+
+    def named(item):
+        return {
+            **item,
+            "payee_name": item.get("payee_name") or payee_names.get(item["payee_id"]),
+            "category_name": item.get("category_name")
+            or category_names.get(item["category_id"]),
+        }
+
+    changed_subtransactions = {}
+    for subtransaction in budget["subtransactions"]:
+        changed_subtransactions.setdefault(subtransaction["transaction_id"], []).append(
+            subtransaction
+        )
+
+    summaries = {summary["id"]: summary for summary in budget["transactions"]}
+    for transaction_id, transaction in stored.items():
+        summaries.setdefault(transaction_id, transaction)
+
+    result = []
+    for transaction_id, summary in summaries.items():
+        if summary.get("deleted"):
+            result.append(summary)
+            continue
+
+        previous = stored.get(transaction_id, {}).get("subtransactions", [])
+        subtransactions = {sub["id"]: sub for sub in previous}
+        for subtransaction in changed_subtransactions.get(transaction_id, []):
+            if subtransaction.get("deleted"):
+                subtransactions.pop(subtransaction["id"], None)
+            else:
+                subtransactions[subtransaction["id"]] = named(subtransaction)
+
+        transaction = named(summary)
+        transaction["account_name"] = account_names.get(summary["account_id"])
+        transaction["subtransactions"] = list(subtransactions.values())
+        if not transaction["category_name"]:
+            transaction["category_name"] = (
+                SPLIT_CATEGORY_NAME if subtransactions else UNCATEGORIZED_NAME
+            )
+        result.append(transaction)
+
+    return result
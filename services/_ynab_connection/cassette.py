@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .paths import cache_dir
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+class Cassette:
+    """
+    Records real YNAB request/response pairs into a JSON file, or serves
+    them back without touching the network.
+
+    Replay matches requests by method, path and query (ignoring
+    `last_knowledge_of_server`, which depends on local state) and hands
+    out the recorded responses for each one in order. Both modes need an
+    empty cache dir: stored deltas and cached metadata decide which
+    requests a run makes, so a warm cache would record (or replay) a
+    different set of them than a cold one.
+
+    The token never reaches the file: the Authorization header is not
+    stored and any occurrence of it in URLs or bodies is replaced.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+    KEPT_RESPONSE_HEADERS = ("Content-Type", "X-Rate-Limit", "Retry-After")
+    IGNORED_PARAMS = ("last_knowledge_of_server",)
+
+    def __init__(self, path, mode, latency=0.0, secrets=()):
+        """
+        Args:
+            path: Cassette file
+            mode: "record" or "replay"
+            latency: Seconds to wait before every replayed response, or
+                "recorded" to wait as long as the real request took
+            secrets: Strings to scrub from everything that is recorded
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._secrets = [secret for secret in secrets if secret]
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._queues = defaultdict(deque)
+
+        if mode == self.REPLAY:
+            with open(path, "r") as f:
+                self._interactions = json.load(f)["interactions"]
+            for interaction in self._interactions:
+                self._queues[self._key(**interaction["request"])].append(interaction)
+
+    @classmethod
+    def from_env(cls, env):
+        """Cassette configured by YNAB_CASSETTE(_MODE) / YNAB_REPLAY_LATENCY, or None"""
+        path = env.get("YNAB_CASSETTE")
+        if not path:
+            return None
+        folder = cache_dir()
+        if os.path.isdir(folder) and os.listdir(folder):
+            raise ValueError(
+                f"YNAB_CACHE_DIR ({folder}) must be empty to record or replay a "
+                "cassette, since cached data changes which requests are made"
+            )
+        latency = env.get("YNAB_REPLAY_LATENCY", "0")
+        return cls(
+            path,
+            env.get("YNAB_CASSETTE_MODE", cls.REPLAY),
+            latency=latency if latency == "recorded" else float(latency),
+            secrets=[env.get("YNAB_TOKEN")],
+        )
+
+    @property
+    def replaying(self):
+        return self.mode == self.REPLAY
+
+    def _key(self, method, path, query, **ignored):
+        query = {k: v for k, v in query.items() if k not in self.IGNORED_PARAMS}
+        return method, path, urlencode(sorted(query.items()))
+
+    @staticmethod
+    def _split_url(url, params):
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        query.update({k: str(v) for k, v in (params or {}).items()})
+        return parts.path, query
+
+    def request(self, session, method, url, params=None, json=None, **kwargs):
+        """Drop-in for session.request that records or replays the exchange"""
+        path, query = self._split_url(url, params)
+        if self.replaying:
+            return self._replay(method, url, path, query)
+
+        started = time.time()
+        response = session.request(method, url, params=params, json=json, **kwargs)
+        response.content  # Read streamed bodies now, iter_content replays them
+        elapsed = time.time() - started
+
+        self._record(
+            {
+                "request": {
+                    "method": method,
+                    "path": self._scrub(path),
+                    "query": {k: self._scrub(v) for k, v in query.items()},
+                    "body": json,
+                },
+                "response": {
+                    "status": response.status_code,
+                    "headers": {
+                        name: response.headers[name]
+                        for name in self.KEPT_RESPONSE_HEADERS
+                        if name in response.headers
+                    },
+                    "body": self._scrub(response.text),
+                    "elapsed": round(elapsed, 4),
+                },
+            }
+        )
+        return response
+
+    def _scrub(self, text):
+        for secret in self._secrets:
+            text = text.replace(secret, "<SCRUBBED>")
+        return text
+
+    def _record(self, interaction):
+        with self._lock:
+            self._interactions.append(interaction)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"interactions": self._interactions}, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def _replay(self, method, url, path, query):
+        key = self._key(method, path, query)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded response left for {method} {path}?{key[2]}")
+            interaction = queue.popleft()
+
+        recorded = interaction["response"]
+        delay = recorded["elapsed"] if self.latency == "recorded" else self.latency
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = recorded["body"].encode("utf-8")
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = url
+        return response
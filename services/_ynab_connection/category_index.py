@@ -0,0 +1,78 @@
+import unicodedata
+from os import environ as env
+
+# Zero-width joiner and the emoji variation selector, left behind by markers
+_MARKER_JOINERS = {"‍", "️"}
+
+
+class CategoryIndex:
+    """
+    Main budget category ids by normalized name, built once per main budget
+
+    Names are always compared stripped. On top of that, `normalization`
+    (or the comma separated `YNAB_CATEGORY_NORMALIZATION` env var) may add:
+
+    - "whitespace": collapse inner runs of whitespace into one space
+    - "case": ignore case
+    - "emoji": ignore emoji markers such as ⚙️ or 🔗
+
+    When several categories share a normalized name the first one wins, as
+    it always did; `ambiguous()` lists them so it doesn't go unnoticed.
+    """
+
+    WHITESPACE = "whitespace"
+    CASE = "case"
+    EMOJI = "emoji"
+    NORMALIZATIONS = (WHITESPACE, CASE, EMOJI)
+
+    def __init__(self, categories, normalization=None):
+        if normalization is None:
+            normalization = [
+                name.strip()
+                for name in env.get("YNAB_CATEGORY_NORMALIZATION", "").split(",")
+                if name.strip()
+            ]
+        unknown = set(normalization) - set(self.NORMALIZATIONS)
+        if unknown:
+            raise ValueError(f"Unknown category normalization: {', '.join(sorted(unknown))}")
+        self.normalization = frozenset(normalization)
+
+        self._ids = {}
+        self._names = {}
+        for category in categories:
+            key = self.normalize(category.name)
+            self._ids.setdefault(key, category.id)
+            self._names.setdefault(key, []).append(category.name)
+
+    def normalize(self, name):
+        if name is None:
+            return None
+        if self.EMOJI in self.normalization:
+            name = "".join(
+                char
+                for char in name
+                if char not in _MARKER_JOINERS and unicodedata.category(char) != "So"
+            )
+        if self.WHITESPACE in self.normalization:
+            name = " ".join(name.split())
+        else:
+            name = name.strip()
+        if self.CASE in self.normalization:
+            name = name.casefold()
+        return name
+
+    def category_id(self, name):
+        """Id of the main budget category matching name, or None"""
+        return self._ids.get(self.normalize(name))
+
+    def items(self):
+        """(normalized name, category id) pairs"""
+        return self._ids.items()
+
+    def missing(self, names):
+        """Names (sorted, without repeats) that match no category"""
+        return sorted({name for name in names if self.category_id(name) is None})
+
+    def ambiguous(self):
+        """Category names that normalize to the same one, grouped"""
+        return [names for names in self._names.values() if len(names) > 1]
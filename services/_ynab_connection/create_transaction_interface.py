@@ -1,9 +1,33 @@
 from os import environ as env
 
-from models import Transaction, Subtransaction, Budget, Category
+from models import Transaction, Subtransaction, Budget
+from models.interning import intern_str
+
+from .category_index import CategoryIndex
+from .rate_timeline import RateTimeline
 
 
 class CreateTransactionInterface:
+    # Payees YNAB generates itself, which must not be copied over
+    IGNORED_PAYEE_PREFIXES = (
+        "Transfer :",
+        "Starting Balance",
+        "Manual Balance Adjustment",
+        "Reconciliation Balance Adjustment",
+    )
+
+    __slots__ = (
+        "account_id",
+        "date",
+        "amount",
+        "category_id",
+        "payee_name",
+        "memo",
+        "cleared",
+        "approved",
+        "flag_color",
+    )
+
     def __init__(
         self,
         account_id,
@@ -16,36 +40,29 @@ class CreateTransactionInterface:
         approved=None,
         flag_color=None,
     ):
-        self.account_id = account_id
-        self.date = date
+        self.account_id = intern_str(account_id)
+        self.date = intern_str(date)
         self.amount = amount
-        self.category_id = category_id
-        self.payee_name = payee_name
+        self.category_id = intern_str(category_id)
+        self.payee_name = intern_str(payee_name)
         self.memo = memo
-        self.cleared = cleared
+        self.cleared = intern_str(cleared)
         self.approved = approved
-        self.flag_color = flag_color
+        self.flag_color = intern_str(flag_color)
 
     @classmethod
     def from_transaction(
         cls,
         budget: Budget,
         transaction: Transaction,
-        main_budget_categories: [Category],
-        main_budget_transactions: [Transaction],
+        category_index: CategoryIndex,
+        rate_timeline: RateTimeline,
     ):
         return cls(
             account_id=cls._account_id(budget),
             date=transaction.date,
-            amount=cls._amount(
-                budget,
-                main_budget_transactions,
-                transaction,
-            ),
-            category_id=cls._category_id(
-                main_budget_categories,
-                transaction.category_name,
-            ),
+            amount=cls._amount(rate_timeline, transaction),
+            category_id=category_index.category_id(transaction.category_name),
             payee_name=cls._payee_name(transaction.payee_name),
             memo=cls._memo(transaction),
             cleared="cleared",
@@ -59,21 +76,14 @@ class CreateTransactionInterface:
         budget: Budget,
         transaction: Transaction,
         subtransaction: Subtransaction,
-        main_budget_categories: [Category],
-        main_budget_transactions: [Transaction],
+        category_index: CategoryIndex,
+        rate_timeline: RateTimeline,
     ):
         return cls(
             account_id=cls._account_id(budget),
             date=transaction.date,
-            amount=cls._amount(
-                budget,
-                main_budget_transactions,
-                subtransaction,
-            ),
-            category_id=cls._category_id(
-                main_budget_categories,
-                subtransaction.category_name,
-            ),
+            amount=cls._amount(rate_timeline, subtransaction),
+            category_id=category_index.category_id(subtransaction.category_name),
             payee_name=cls._payee_name(subtransaction.payee_name),
             memo=cls._memo(subtransaction),
             cleared="cleared",
@@ -92,57 +102,29 @@ class CreateTransactionInterface:
 
         return account_id
 
-    @staticmethod
-    def _category_id(main_budget_categories: [Category], category_name: str):
-        for category in main_budget_categories:
-            if category.name.strip() == category_name.strip():
-                return category.id
-        return None
-
     @staticmethod
     def _memo(transaction):
         return "{} {}".format(transaction.memo, transaction.identifier)
 
     @staticmethod
     def _payee_name(payee_name):
-        if payee_name is not None and (
-            payee_name.startswith("Transfer :")
-            or payee_name.startswith("Starting Balance")
-            or payee_name.startswith("Manual Balance Adjustment")
-            or payee_name.startswith("Reconciliation Balance Adjustment")
+        if payee_name is not None and payee_name.startswith(
+            CreateTransactionInterface.IGNORED_PAYEE_PREFIXES
         ):
             return None
         return payee_name
 
+    @classmethod
+    def rate_timeline(cls, budget: Budget, main_budget_transactions: [Transaction]):
+        """Rates of the main budget account that mirrors budget, for _amount"""
+        return RateTimeline(main_budget_transactions, cls._account_id(budget))
+
     @staticmethod
     def _amount(
-        budget: Budget,
-        main_budget_transactions: [Transaction],
+        rate_timeline: RateTimeline,
         transaction: Transaction | Subtransaction,
     ):
-        if budget.name == "BOB Budget":
-            account_id = env.get("BOB_BUDGET_ACCOUNT")
-        elif budget.name == "ARS Budget":
-            account_id = env.get("ARS_BUDGET_ACCOUNT")
-        else:
-            account_id = None
-
-        previous_transactions = [
-            t
-            for t in main_budget_transactions
-            if t.date <= transaction.date
-            and t.exchange_rate is not None
-            and t.account_id == account_id
-        ]
-        sorted_transactions = sorted(
-            previous_transactions,
-            key=lambda t: (t.date, -t.exchange_rate),
-            reverse=True,
-        )
-
-        last_exchange_rate = (
-            sorted_transactions[0].exchange_rate if sorted_transactions else 1.0
-        )
+        last_exchange_rate = rate_timeline.rate_on(transaction.date_ordinal)
 
         # Since against USD the relevant info is the local currency,
         # we need to invert the exchange rate instead of multiplying by it
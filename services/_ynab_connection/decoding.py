@@ -0,0 +1,142 @@
+"""
+Typed decoding of YNAB transactions and categories
+
+With msgspec installed, JSON goes straight into typed dicts holding only the
+fields the models use: types are validated and every other field is skipped
+without being built. That covers both ends of the local store: delta
+responses on their way in (`decode_delta`) and rows on their way out
+(`decoders`). Without it (or with fast decoding turned off) everything goes
+through `json`.
+"""
+
+import json
+from typing import Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # Optional, plain json is used instead
+    msgspec = None
+
+
+def decoders(fast=True):
+    """(transaction decoder, category decoder), JSON text -> dict"""
+    if not (fast and msgspec):
+        return json.loads, json.loads
+    return (
+        msgspec.json.Decoder(TransactionRecord).decode,
+        msgspec.json.Decoder(CategoryRecord).decode,
+    )
+
+
+def delta_decoder(fast=True):
+    """decode_delta, or None when responses have to go through `json`"""
+    return decode_delta if fast and msgspec else None
+
+
+class SubtransactionRecord(TypedDict):
+    id: str
+    amount: int
+    memo: Optional[str]
+    payee_id: Optional[str]
+    payee_name: Optional[str]
+    category_id: Optional[str]
+    category_name: Optional[str]
+
+
+class TransactionRecord(TypedDict):
+    id: str
+    date: str
+    account_id: str
+    amount: int
+    cleared: str
+    approved: bool
+    deleted: bool
+    memo: Optional[str]
+    payee_id: Optional[str]
+    payee_name: Optional[str]
+    category_id: Optional[str]
+    category_name: Optional[str]
+    flag_color: Optional[str]
+    account_name: Optional[str]
+    transfer_account_id: Optional[str]
+    transfer_transaction_id: Optional[str]
+    matched_transaction_id: Optional[str]
+    subtransactions: list[SubtransactionRecord]
+
+
+class CategoryRecord(TypedDict):
+    id: str
+    category_group_id: str
+    category_group_name: Optional[str]
+    name: str
+    hidden: bool
+    note: Optional[str]
+    budgeted: int
+    activity: int
+    balance: int
+    deleted: bool
+
+
+class ItemColumns(TypedDict, total=False):
+    """What LocalStore indexes of a delta item (see LocalStore.apply_rows)"""
+
+    id: str
+    deleted: bool
+    name: str
+    account_id: str
+    date: str
+    category_id: Optional[str]
+    memo: Optional[str]
+
+
+if msgspec:
+
+    class _TransactionsDelta(msgspec.Struct):
+        transactions: list[msgspec.Raw]
+        server_knowledge: int
+
+    class _AccountsDelta(msgspec.Struct):
+        accounts: list[msgspec.Raw]
+        server_knowledge: int
+
+    class _CategoryGroup(msgspec.Struct):
+        categories: list[msgspec.Raw]
+
+    class _CategoriesDelta(msgspec.Struct):
+        category_groups: list[_CategoryGroup]
+        server_knowledge: int
+
+    _delta_decoders = {
+        "transactions": msgspec.json.Decoder(dict[str, _TransactionsDelta]),
+        "accounts": msgspec.json.Decoder(dict[str, _AccountsDelta]),
+        "categories": msgspec.json.Decoder(dict[str, _CategoriesDelta]),
+    }
+    _decode_columns = msgspec.json.Decoder(ItemColumns).decode
+
+    DELTA_ENDPOINTS = frozenset(_delta_decoders)
+
+    def decode_delta(endpoint, body):
+        """
+        (rows, server_knowledge) of a `/budgets/{id}/<endpoint>` response
+
+        `body` is any buffer (bytes, an mmap of a spooled response). Items
+        are only split off as raw JSON, which each row keeps as its text
+        next to the decoded columns; rows are produced lazily.
+        """
+        try:
+            data = _delta_decoders[endpoint].decode(body)["data"]
+        except msgspec.ValidationError as error:
+            raise ValueError(f"Unexpected YNAB {endpoint} response: {error}") from error
+        if endpoint == "categories":
+            items = [
+                category
+                for category_group in data.category_groups
+                for category in category_group.categories
+            ]
+        else:
+            items = getattr(data, endpoint)
+        rows = ((_decode_columns(item), bytes(item).decode()) for item in items)
+        return rows, data.server_knowledge
+
+else:
+    DELTA_ENDPOINTS = frozenset()
@@ -0,0 +1,121 @@
+import atexit
+import json
+import re
+import threading
+import time
+from os import environ as env
+
+from .paths import cache_path
+
+_BUDGET_PATH = re.compile(r"^/budgets/([^/]+)(.*)$")
+
+
+class RequestLog:
+    """
+    One structured record per YNAB request (endpoint, budget, latency,
+    status, response size, rate-limit headroom and retries), appended to a
+    JSONL sink and summarized per endpoint when the process exits.
+
+    The sink defaults to `.ynab_cache/metrics.jsonl` (`YNAB_METRICS_PATH`);
+    `YNAB_METRICS=off` disables it together with the summary.
+    """
+
+    def __init__(self, path=None):
+        self.enabled = env.get("YNAB_METRICS", "on").lower() not in ("0", "off", "false")
+        self._path = path or env.get("YNAB_METRICS_PATH")
+        self.records = []
+        self._lock = threading.Lock()
+        self._summary_registered = False
+
+    @staticmethod
+    def split_path(path):
+        """('/budgets/{budget_id}/transactions', '<id>') out of a request path"""
+        match = _BUDGET_PATH.match(path)
+        if not match:
+            return path, None
+        budget_id, rest = match.groups()
+        return "/budgets/{budget_id}" + rest, budget_id
+
+    def start(self, method, path):
+        endpoint, budget_id = self.split_path(path)
+        return {
+            "method": method,
+            "endpoint": endpoint,
+            "budget_id": budget_id,
+            "started_at": time.time(),
+            "retries": 0,
+        }
+
+    def finish(self, record, response=None, size=None, error=None):
+        record["latency_ms"] = round((time.time() - record["started_at"]) * 1000, 1)
+        record["status"] = response.status_code if response is not None else None
+        record["bytes"] = size
+        record["rate_limit_remaining"] = self._remaining(response)
+        if error is not None:
+            record["error"] = type(error).__name__
+        self.emit(record)
+
+    @staticmethod
+    def _remaining(response):
+        header = response is not None and response.headers.get("X-Rate-Limit")
+        if not header:
+            return None
+        try:
+            used, limit = (int(part) for part in header.split("/"))
+        except ValueError:
+            return None
+        return limit - used
+
+    def emit(self, record):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.records.append(record)
+            with open(self._path or cache_path("metrics.jsonl"), "a") as f:
+                f.write(json.dumps(record) + "\n")
+            if not self._summary_registered:
+                atexit.register(self.print_summary)
+                self._summary_registered = True
+
+    def summary(self):
+        """Per (method, endpoint) totals, slowest endpoints first"""
+        rows = {}
+        for record in self.records:
+            key = (record["method"], record["endpoint"])
+            row = rows.setdefault(
+                key,
+                {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0},
+            )
+            row["calls"] += 1
+            row["retries"] += record["retries"]
+            row["total_ms"] += record["latency_ms"]
+            row["max_ms"] = max(row["max_ms"], record["latency_ms"])
+            row["bytes"] += record["bytes"] or 0
+            if record["status"] is None or record["status"] >= 400:
+                row["errors"] += 1
+        return sorted(rows.items(), key=lambda item: -item[1]["total_ms"])
+
+    def print_summary(self):
+        if not self.records:
+            return
+        header = f"{'request':<48} {'calls':>5} {'err':>4} {'retry':>5} {'total s':>8} {'avg ms':>8} {'max ms':>8} {'KB':>9}"
+        print("\nYNAB requests")
+        print(header)
+        print("-" * len(header))
+        for (method, endpoint), row in self.summary():
+            print(
+                f"{method + ' ' + endpoint:<48} {row['calls']:>5} {row['errors']:>4} "
+                f"{row['retries']:>5} {row['total_ms'] / 1000:>8.2f} "
+                f"{row['total_ms'] / row['calls']:>8.0f} {row['max_ms']:>8.0f} "
+                f"{row['bytes'] / 1024:>9.1f}"
+            )
+        remaining = next(
+            (
+                record["rate_limit_remaining"]
+                for record in reversed(self.records)
+                if record["rate_limit_remaining"] is not None
+            ),
+            None,
+        )
+        if remaining is not None:
+            print(f"Rate limit remaining: {remaining}")
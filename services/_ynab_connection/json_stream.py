@@ -0,0 +1,70 @@
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_separators = re.compile(r"[\s,]*")
+
+
+class JSONArrayStream:
+    """
+    Incremental decoder for the `"<key>": [...]` array of a JSON response
+
+    Feeding it the raw byte chunks of a response yields every array item as
+    soon as its closing brace arrives, so the full body (and a dict for every
+    item) never has to be in memory at once. The text before and after the
+    array is kept in `head` and `tail`, since fields like `server_knowledge`
+    may come on either side of it.
+    """
+
+    def __init__(self, key):
+        self._start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.head = ""
+        self.tail = ""
+
+    def items(self, chunks):
+        text = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        in_array = False
+        done = False
+
+        for chunk in chunks:
+            buffer += text.decode(chunk)
+            if done:
+                continue
+
+            position = 0
+            if not in_array:
+                match = self._start.search(buffer)
+                if not match:
+                    continue
+                in_array = True
+                self.head = buffer[: match.start()]
+                position = match.end()
+
+            while True:
+                position = _separators.match(buffer, position).end()
+                if position >= len(buffer):
+                    break
+                if buffer[position] == "]":
+                    done = True
+                    position += 1
+                    break
+                try:
+                    item, position = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    break  # Item still incomplete, wait for more bytes
+                yield item
+
+            buffer = buffer[position:]
+
+        buffer += text.decode(b"", final=True)
+        if not done:
+            raise ValueError("JSON stream ended before the array was closed")
+        self.tail = buffer
+
+    def int_field(self, key):
+        """Read an integer field (e.g. server_knowledge) from around the array"""
+        pattern = re.compile(r'"%s"\s*:\s*(-?\d+)' % re.escape(key))
+        match = pattern.search(self.head) or pattern.search(self.tail)
+        return int(match.group(1)) if match else None
@@ -0,0 +1,278 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .paths import cache_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    budget_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (budget_id, id)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    budget_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (budget_id, id)
+);
+CREATE TABLE IF NOT EXISTS payees (
+    budget_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (budget_id, id)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    budget_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    category_id TEXT,
+    memo_identifier TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (budget_id, id)
+);
+CREATE INDEX IF NOT EXISTS transactions_account_date
+    ON transactions (budget_id, account_id, date);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (budget_id, date);
+CREATE INDEX IF NOT EXISTS transactions_category
+    ON transactions (budget_id, category_id);
+CREATE INDEX IF NOT EXISTS transactions_memo_identifier
+    ON transactions (budget_id, memo_identifier);
+CREATE TABLE IF NOT EXISTS budget_sync (
+    budget_id TEXT PRIMARY KEY,
+    last_modified_on TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_runs (
+    name TEXT PRIMARY KEY,
+    last_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    budget_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    server_knowledge INTEGER NOT NULL,
+    since_date TEXT,
+    PRIMARY KEY (budget_id, endpoint)
+);
+"""
+
+
+class LocalStore:
+    """
+    On-disk SQLite mirror of the YNAB data we read, kept fresh by delta
+    requests. WAL mode lets several processes (main.py and the bank
+    pipelines) read the same warm copy while one of them writes.
+    """
+
+    # Full budget hydration (`/budgets/{id}`) writes into every table
+    BUDGET_ENDPOINT = "budget"
+
+    def __init__(self, path=None):
+        self._path = path or cache_path("ynab.sqlite3")
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    @property
+    def _connection(self):
+        """One connection per thread, since sqlite3 connections can't be shared"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """Commit every write made in the block together, or none of them"""
+        connection = self._connection
+        with self._write_lock, connection:
+            self._local.in_transaction = True
+            try:
+                yield
+            finally:
+                self._local.in_transaction = False
+
+    @contextmanager
+    def _writing(self):
+        """Lock and commit around one write, unless a transaction() is open"""
+        connection = self._connection
+        if getattr(self._local, "in_transaction", False):
+            yield connection
+            return
+        with self._write_lock, connection:
+            yield connection
+
+    def sync_state(self, budget_id, endpoint):
+        """Returns (server_knowledge, since_date) of the last delta, or None"""
+        return self._connection.execute(
+            "SELECT server_knowledge, since_date FROM sync_state "
+            "WHERE budget_id = ? AND endpoint = ?",
+            (budget_id, endpoint),
+        ).fetchone()
+
+    def apply_delta(self, budget_id, endpoint, items, reset=False):
+        """Upsert changed items and drop deleted ones
+
+        `reset` wipes the endpoint (and its sync state) first, for full
+        downloads. The new knowledge is saved separately, once every batch
+        of a delta made it in. Since budget hydration shares the tables, a
+        reset also forgets its knowledge.
+        """
+        self.apply_rows(
+            budget_id, endpoint, ((item, json.dumps(item)) for item in items), reset
+        )
+
+    def apply_rows(self, budget_id, endpoint, rows, reset=False):
+        """apply_delta() for items already encoded, as (columns, JSON text)
+
+        `columns` only needs what the table indexes (`id`, `deleted`, plus
+        `name` for categories or `account_id`, `date`, `category_id` and
+        `memo` for transactions); the text is stored as is.
+        """
+        with self._writing() as connection:
+            if reset:
+                connection.execute(
+                    f"DELETE FROM {endpoint} WHERE budget_id = ?", (budget_id,)
+                )
+                connection.execute(
+                    "DELETE FROM sync_state WHERE budget_id = ? AND endpoint IN (?, ?)",
+                    (budget_id, endpoint, self.BUDGET_ENDPOINT),
+                )
+            for item, data in rows:
+                if item.get("deleted"):
+                    connection.execute(
+                        f"DELETE FROM {endpoint} WHERE budget_id = ? AND id = ?",
+                        (budget_id, item["id"]),
+                    )
+                else:
+                    self._upsert(connection, budget_id, endpoint, item, data)
+
+    def save_sync_state(self, budget_id, endpoint, server_knowledge, since_date):
+        with self._writing() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (budget_id, endpoint, server_knowledge, since_date),
+            )
+
+    @staticmethod
+    def _upsert(connection, budget_id, endpoint, item, data):
+        if endpoint == "transactions":
+            memo = item.get("memo")
+            connection.execute(
+                "INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (budget_id, id) DO UPDATE SET "
+                "account_id = excluded.account_id, date = excluded.date, "
+                "category_id = excluded.category_id, "
+                "memo_identifier = excluded.memo_identifier, data = excluded.data",
+                (
+                    budget_id,
+                    item["id"],
+                    item["account_id"],
+                    item["date"],
+                    item.get("category_id"),
+                    memo and memo.strip()[-13:],
+                    data,
+                ),
+            )
+        elif endpoint == "categories":
+            # Upsert (not REPLACE) keeps the rowid, and so YNAB's ordering
+            connection.execute(
+                "INSERT INTO categories VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (budget_id, id) DO UPDATE SET "
+                "name = excluded.name, data = excluded.data",
+                (budget_id, item["id"], item["name"], data),
+            )
+        else:
+            connection.execute(
+                f"INSERT INTO {endpoint} VALUES (?, ?, ?) "
+                "ON CONFLICT (budget_id, id) DO UPDATE SET data = excluded.data",
+                (budget_id, item["id"], data),
+            )
+
+    def synced_last_modified_on(self, budget_id):
+        """`last_modified_on` the budget had when it was last fully synced"""
+        row = self._connection.execute(
+            "SELECT last_modified_on FROM budget_sync WHERE budget_id = ?",
+            (budget_id,),
+        ).fetchone()
+        return row and row[0]
+
+    def mark_budget_synced(self, budget_id, last_modified_on):
+        with self._writing() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO budget_sync VALUES (?, ?)",
+                (budget_id, last_modified_on),
+            )
+
+    def last_run_date(self, name):
+        """Date the named sync (e.g. "transactions") last completed on, or None"""
+        row = self._connection.execute(
+            "SELECT last_date FROM sync_runs WHERE name = ?", (name,)
+        ).fetchone()
+        return row and row[0]
+
+    def save_run_date(self, name, date):
+        with self._writing() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sync_runs VALUES (?, ?)", (name, date)
+            )
+
+    def categories(self, budget_id, decode=json.loads):
+        return self._load(
+            "SELECT data FROM categories WHERE budget_id = ? ORDER BY rowid",
+            (budget_id,),
+            decode,
+        )
+
+    def accounts(self, budget_id):
+        return self._load(
+            "SELECT data FROM accounts WHERE budget_id = ? ORDER BY rowid",
+            (budget_id,),
+        )
+
+    def payees(self, budget_id):
+        return self._load(
+            "SELECT data FROM payees WHERE budget_id = ? ORDER BY rowid",
+            (budget_id,),
+        )
+
+    def transactions_by_id(self, budget_id, ids):
+        ids = list(ids)
+        if not ids:
+            return []
+        return self._load(
+            "SELECT data FROM transactions WHERE budget_id = ? "
+            f"AND id IN ({', '.join('?' * len(ids))})",
+            [budget_id, *ids],
+        )
+
+    def iter_transactions(
+        self, budget_id, since_date=None, account_id=None, decode=json.loads
+    ):
+        """Transactions of a budget, oldest first, decoded one row at a time"""
+        query = "SELECT data FROM transactions WHERE budget_id = ?"
+        params = [budget_id]
+        if account_id:
+            query += " AND account_id = ?"
+            params.append(account_id)
+        if since_date:
+            query += " AND date >= ?"
+            params.append(since_date)
+        for (data,) in self._connection.execute(query + " ORDER BY date, rowid", params):
+            yield decode(data)
+
+    def last_transaction_date(self, budget_id, account_id):
+        (last_date,) = self._connection.execute(
+            "SELECT MAX(date) FROM transactions WHERE budget_id = ? AND account_id = ?",
+            (budget_id, account_id),
+        ).fetchone()
+        return last_date
+
+    def _load(self, query, params=(), decode=json.loads):
+        return [decode(data) for (data,) in self._connection.execute(query, params)]
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from os import environ as env
+
+from .paths import cache_path
+
+
+class MetadataCache:
+    """
+    TTL cache for slow-changing YNAB metadata (budget list, accounts,
+    category lists), kept in memory and mirrored to disk so separate
+    pipeline runs can resolve names and accounts without asking YNAB again.
+
+    The TTL defaults to `YNAB_METADATA_TTL` seconds (0 disables the cache).
+    """
+
+    DEFAULT_TTL = 600
+
+    def __init__(self, ttl=None, folder="metadata"):
+        if ttl is None:
+            ttl = float(env.get("YNAB_METADATA_TTL", self.DEFAULT_TTL))
+        self.ttl = ttl
+        self._folder = folder
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return cache_path(self._folder, key.replace(":", ".") + ".json")
+
+    def get(self, key):
+        """Cached value for key, or None if missing or older than the TTL"""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is None:
+                return None
+            with self._lock:
+                self._memory[key] = entry
+
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl:
+            return None
+        return value
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data["stored_at"], data["value"]
+
+    def set(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._memory[key] = entry
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"stored_at": entry[0], "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, prefix=""):
+        """Drop every entry whose key starts with prefix (all of them by default)"""
+        with self._lock:
+            for key in [key for key in self._memory if key.startswith(prefix)]:
+                del self._memory[key]
+        folder = os.path.dirname(self._path("_"))
+        file_prefix = prefix.replace(":", ".")
+        for name in os.listdir(folder):
+            if name.startswith(file_prefix) and name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass  # Another process got there first
@@ -0,0 +1,30 @@
+class MirrorIndex:
+    """
+    Tells whether a source transaction is already mirrored in the main
+    budget, in O(1): either a mirror's memo ends with the source's
+    `identifier`, or the source's memo ends with a mirror's `identifier`
+    (two set lookups instead of a scan over every main budget
+    transaction).
+    """
+
+    def __init__(self, main_budget_transactions):
+        """
+        Args:
+            main_budget_transactions: Flattened transactions of the main
+                budget mirror accounts
+        """
+        self._memo_identifiers = set()
+        self._identifiers = set()
+        for transaction in main_budget_transactions:
+            self._identifiers.add(transaction.identifier)
+            if transaction.memo_identifier:
+                self._memo_identifiers.add(transaction.memo_identifier)
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    def __contains__(self, transaction):
+        return (
+            transaction.identifier in self._memo_identifiers
+            or transaction.memo_identifier in self._identifiers
+        )
@@ -0,0 +1,22 @@
+import os
+from os import environ as env
+
+REPO_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+DEFAULT_CACHE_DIR = os.path.join(REPO_DIR, ".ynab_cache")
+
+
+def cache_dir():
+    return env.get("YNAB_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+def cache_path(*parts):
+    """Path inside the local YNAB cache dir, creating parent folders on demand
+
+    The dir is read from `YNAB_CACHE_DIR` on every call, so values loaded
+    from `.env` after import are still honored.
+    """
+    path = os.path.join(cache_dir(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,100 @@
+import fcntl
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from .paths import cache_path
+
+
+class RateLimiter:
+    """
+    Token bucket for the YNAB API limit (about 200 requests per hour per
+    token), shared by every process that uses the same cache dir.
+
+    The bucket lives in a file guarded by an exclusive `flock`, refills
+    continuously and is corrected with the `X-Rate-Limit: used/limit`
+    header of every response. Lower priorities keep a reserve of tokens
+    untouched, so when headroom is low they wait and let the writes that
+    finish a sync go first.
+    """
+
+    LIMIT = 200
+    WINDOW = 3600  # seconds
+    MAX_SLEEP = 60  # re-check the shared state at least this often
+
+    PRIORITY_HIGH = "high"
+    PRIORITY_NORMAL = "normal"
+    PRIORITY_LOW = "low"
+    RESERVES = {
+        PRIORITY_HIGH: 0.0,
+        PRIORITY_NORMAL: 0.05,
+        PRIORITY_LOW: 0.25,
+    }  # fraction of the limit a priority can't spend
+
+    def __init__(self, path=None):
+        self._path = path or cache_path("rate_limit.json")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        with self._lock, open(self._path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw)
+            except ValueError:
+                state = {"limit": self.LIMIT, "tokens": self.LIMIT, "updated_at": time.time()}
+            self._refill(state)
+
+            yield state
+
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+
+    def _refill(self, state):
+        now = time.time()
+        elapsed = max(now - state["updated_at"], 0)
+        state["tokens"] = min(
+            state["limit"], state["tokens"] + elapsed * state["limit"] / self.WINDOW
+        )
+        state["updated_at"] = now
+
+    def acquire(self, priority=PRIORITY_NORMAL):
+        """Take a token, sleeping while the bucket is below this priority's reserve"""
+        while True:
+            with self._state() as state:
+                reserve = state["limit"] * self.RESERVES[priority]
+                if state["tokens"] - 1 >= reserve:
+                    state["tokens"] -= 1
+                    return
+                missing = reserve + 1 - state["tokens"]
+                wait = missing * self.WINDOW / state["limit"]
+
+            print(
+                f"YNAB rate limit low ({int(state['tokens'])} left), "
+                f"delaying {priority} priority request {wait:.0f}s",
+                flush=True,
+            )
+            time.sleep(min(wait, self.MAX_SLEEP))
+
+    def update(self, header):
+        """Align the bucket with YNAB's `X-Rate-Limit: used/limit` header"""
+        try:
+            used, limit = (int(part) for part in header.split("/"))
+        except ValueError:
+            return
+        with self._state() as state:
+            state["limit"] = limit
+            state["tokens"] = max(limit - used, 0)
+
+    def exhaust(self):
+        """YNAB answered 429: nobody should spend tokens until they refill"""
+        with self._state() as state:
+            state["tokens"] = 0
+
+    def remaining(self):
+        with self._state() as state:
+            return int(state["tokens"])
@@ -0,0 +1,36 @@
+from bisect import bisect_right
+
+
+class RateTimeline:
+    """
+    Exchange rate in effect on each day for one mirror account, out of the
+    `[TC:x]` memos of its transactions: the rate of the latest day with one
+    on or before the given day (the lowest, when that day has several),
+    found by binary search. Before the first rate, 1.0 applies.
+    """
+
+    DEFAULT_RATE = 1.0
+
+    def __init__(self, transactions, account_id):
+        """
+        Args:
+            transactions: Main budget transactions (and subtransactions)
+            account_id: Mirror account whose rates are used
+        """
+        rates = {}
+        for transaction in transactions:
+            rate = transaction.exchange_rate
+            if rate is None or transaction.account_id != account_id:
+                continue
+            day = transaction.date_ordinal
+            if day not in rates or rate < rates[day]:
+                rates[day] = rate
+        self._days = sorted(rates)
+        self._rates = [rates[day] for day in self._days]
+
+    def __len__(self):
+        return len(self._days)
+
+    def rate_on(self, date_ordinal):
+        index = bisect_right(self._days, date_ordinal)
+        return self._rates[index - 1] if index else self.DEFAULT_RATE
@@ -1,7 +1,8 @@
+import asyncio
 import datetime
 
 from models import Budget
-from services._ynab_connection import YNABClient
+from services._ynab_connection import YNABClient, AsyncYNABClient
 
 
 def validate_budget(budget):
@@ -16,28 +17,136 @@ def validate_category(category):
     return not (category.hidden or category.deleted or "⚙️" in category.name)
 
 
+def _log_unchanged(budget):
+    print(f"{budget.name} unchanged since last sync, using stored data")
+
+
 def relevant_budgets():
-    budgets = YNABClient().get_budgets()
+    # The sync needs fresh last_modified_on and category names, so it skips
+    # the metadata TTL cache (delta requests keep this cheap anyway)
+    client = YNABClient.shared()
+    budgets = client.get_budgets(cached=False)
     budgets = list(filter(validate_budget, budgets))
 
     for budget in budgets:
-        categories = YNABClient().get_categories(budget.id)
+        unchanged = client.budget_unchanged(budget)
+        if unchanged:
+            _log_unchanged(budget)
+        categories = client.get_categories(
+            budget.id, use_stored=unchanged, cached=False
+        )
         categories = list(filter(validate_category, categories))
         budget.assign_categories(categories)
 
+    return _split_budgets(budgets)
+
+
+async def relevant_budgets_async(client: AsyncYNABClient = None):
+    """Same as relevant_budgets, fetching every budget's categories concurrently"""
+    client = client or AsyncYNABClient()
+    budgets = await client.get_budgets(cached=False)
+    budgets = list(filter(validate_budget, budgets))
+
+    unchanged = await asyncio.gather(
+        *(client.budget_unchanged(budget) for budget in budgets)
+    )
+    for budget in (budget for budget, skip in zip(budgets, unchanged) if skip):
+        _log_unchanged(budget)
+
+    budget_categories = await asyncio.gather(
+        *(
+            client.get_categories(budget.id, use_stored=skip, cached=False)
+            for budget, skip in zip(budgets, unchanged)
+        )
+    )
+    for budget, categories in zip(budgets, budget_categories):
+        categories = list(filter(validate_category, categories))
+        budget.assign_categories(categories)
+
+    return _split_budgets(budgets)
+
+
+def hydrate_budgets(since_date: str = None):
+    """relevant_budgets + fill_transactions with one request per budget
+
+    Each budget is loaded from the `/budgets/{id}` export (a delta after the
+    first run), and the budget list itself may come from the metadata cache.
+    """
+    client = YNABClient.shared()
+    budgets = list(filter(validate_budget, client.get_budgets()))
+
+    for budget in budgets:
+        client.refresh_budget(budget.id)
+        _assign_stored(
+            budget,
+            client.stored_categories(budget.id),
+            client.stored_transactions(budget.id, since_date),
+        )
+
+    return _split_budgets(budgets)
+
+
+async def hydrate_budgets_async(
+    since_date: str = None, client: AsyncYNABClient = None
+):
+    """Same as hydrate_budgets, loading every budget concurrently"""
+    client = client or AsyncYNABClient()
+    budgets = list(filter(validate_budget, await client.get_budgets()))
+
+    async def hydrate(budget):
+        await client.refresh_budget(budget.id)
+        _assign_stored(
+            budget,
+            await client.stored_categories(budget.id),
+            await client.stored_transactions(budget.id, since_date),
+        )
+
+    await asyncio.gather(*(hydrate(budget) for budget in budgets))
+
+    return _split_budgets(budgets)
+
+
+def _assign_stored(budget, categories, transactions):
+    budget.assign_categories(list(filter(validate_category, categories)))
+    budget.assign_transactions(transactions)
+
+
+def _split_budgets(budgets):
     usd_budget = next(budget for budget in budgets if budget.name == "USD Budget")
     sync_budgets = [budget for budget in budgets if budget.name != "USD Budget"]
     return usd_budget, sync_budgets
 
 
-def fill_transactions(budget: Budget, since_date: str):
+def fill_transactions(budget: Budget, since_date: str = None):
     """Fill budget with transactions from the specified date
 
     Args:
         budget: Budget to fill with transactions
-        since_date: Start date for fetching transactions (YYYY-MM-DD format)
+        since_date: Start date for fetching transactions (YYYY-MM-DD format),
+            or None for the whole (delta-synced) history
+
+    Budgets whose `last_modified_on` didn't move since the last sync are
+    filled from the local store without asking YNAB.
     """
-    transactions = YNABClient().get_transactions(budget.id, since_date)
+    client = YNABClient.shared()
+    transactions = client.get_transactions(
+        budget.id, since_date, use_stored=client.budget_unchanged(budget)
+    )
+    budget.assign_transactions(transactions)
+    client.mark_budget_synced(budget)
+
+    return budget
+
+
+async def fill_transactions_async(
+    budget: Budget, since_date: str = None, client: AsyncYNABClient = None
+):
+    """Async fill_transactions, meant to be gathered for several budgets"""
+    client = client or AsyncYNABClient()
+    transactions = await client.get_transactions(
+        budget.id, since_date, use_stored=await client.budget_unchanged(budget)
+    )
     budget.assign_transactions(transactions)
+    await client.mark_budget_synced(budget)
 
     return budget
@@ -0,0 +1,168 @@
+"""
+Columnar version of `transaction_provider._process_transactions`
+
+Source and main budget transactions are loaded into pandas columns once, and
+every step runs over whole columns instead of per transaction:
+
+- the ⚙️/🔗/Transfer and credit card filters are boolean masks
+- already mirrored transactions are dropped with a hash join on identifiers
+- exchange rates come from an as-of merge on date against the mirror
+  account's `[TC:x]` transactions
+- categories are mapped with a join on their normalized names
+
+It yields exactly the `CreateTransactionInterface` payloads of the iterative
+engine, in the same order. pandas is only imported when this engine is used.
+"""
+
+from models import Budget
+from services._ynab_connection import CategoryIndex, CreateTransactionInterface
+from services.transaction_provider import BISA_CC_ACCOUNT_ID, _main_budget_transactions
+
+SOURCE_COLUMNS = (
+    "account_id",
+    "date",
+    "day",
+    "amount",
+    "memo",
+    "identifier",
+    "memo_identifier",
+    "category_name",
+    "payee_name",
+    "flag_color",
+)
+
+
+def _source_rows(budget: Budget):
+    """One row per transaction or, for splits, per subtransaction"""
+    for transaction in budget.transactions:
+        for source in transaction.subtransactions or [transaction]:
+            yield (
+                transaction.account_id,
+                transaction.date,
+                transaction.date_ordinal,
+                source.amount,
+                source.memo,
+                source.identifier,
+                source.memo_identifier,
+                source.category_name,
+                source.payee_name,
+                transaction.flag_color,
+            )
+
+
+def _nullable(series):
+    """Column values as a list, with pandas' missing values back to None"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _contains(series, text):
+    return series.str.contains(text, regex=False, na=False)
+
+
+def process_transactions(
+    budget: Budget,
+    main_budget: Budget,
+    category_index: CategoryIndex,
+    only_credit_card: bool = False,
+) -> [CreateTransactionInterface]:
+    import numpy as np
+    import pandas as pd
+
+    sources = pd.DataFrame(
+        list(_source_rows(budget)), columns=SOURCE_COLUMNS, dtype=object
+    )
+    if sources.empty:
+        return []
+    sources["amount"] = sources["amount"].astype("int64")
+    sources["day"] = sources["day"].astype("int64")
+
+    main_budget_transactions = _main_budget_transactions(main_budget)
+    mirrors = pd.DataFrame(
+        [
+            (t.account_id, t.date_ordinal, t.identifier, t.memo_identifier, t.exchange_rate)
+            for t in main_budget_transactions
+        ],
+        columns=("account_id", "day", "identifier", "memo_identifier", "rate"),
+        dtype=object,
+    )
+
+    # Filters
+    credit_card = sources["account_id"] == BISA_CC_ACCOUNT_ID
+    keep = credit_card if only_credit_card else ~credit_card
+    keep &= ~_contains(sources["category_name"], "⚙️")
+    keep &= ~_contains(sources["category_name"], "🔗")
+    keep &= ~_contains(sources["payee_name"], "Transfer :")
+
+    # Already mirrored (same matching as MirrorIndex)
+    keep &= ~(
+        sources["identifier"].isin(mirrors["memo_identifier"].dropna())
+        | sources["memo_identifier"].isin(mirrors["identifier"])
+    )
+
+    sources = sources[keep].copy()
+    if sources.empty:
+        return []
+
+    # Exchange rates: latest [TC:x] on or before each date (the lowest one
+    # when a day has several), 1.0 before the first one
+    account_id = CreateTransactionInterface._account_id(budget)
+    rates = mirrors[(mirrors["account_id"] == account_id) & mirrors["rate"].notna()]
+    sources["position"] = np.arange(len(sources))
+    if rates.empty:
+        sources["rate"] = 1.0
+    else:
+        rates = (
+            rates.assign(
+                day=rates["day"].astype("int64"),
+                rate=rates["rate"].astype("float64"),
+            )
+            .groupby("day", as_index=False)["rate"]
+            .min()
+        )
+        sources = pd.merge_asof(
+            sources.sort_values("day", kind="stable"),
+            rates,
+            on="day",
+            direction="backward",
+        ).sort_values("position")
+        sources["rate"] = sources["rate"].fillna(1.0)
+    amounts = np.trunc(sources["amount"].to_numpy() / sources["rate"].to_numpy())
+
+    # Categories: first main budget category with the same normalized name
+    categories = pd.DataFrame(
+        list(category_index.items()),
+        columns=("category_key", "category_id"),
+        dtype=object,
+    )
+    sources["category_key"] = sources["category_name"].map(category_index.normalize)
+    sources = sources.merge(categories, how="left", on="category_key")
+
+    payee_names = sources["payee_name"].where(
+        ~sources["payee_name"].str.startswith(
+            CreateTransactionInterface.IGNORED_PAYEE_PREFIXES, na=False
+        ),
+        None,
+    )
+    memos = sources["memo"].map(str) + " " + sources["identifier"]
+
+    return [
+        CreateTransactionInterface(
+            account_id=account_id,
+            date=date,
+            amount=amount,
+            category_id=category_id,
+            payee_name=payee_name,
+            memo=memo,
+            cleared="cleared",
+            approved=True,
+            flag_color=flag_color,
+        )
+        for date, amount, category_id, payee_name, memo, flag_color in zip(
+            sources["date"].tolist(),
+            amounts.astype("int64").tolist(),
+            _nullable(sources["category_id"]),
+            _nullable(payee_names),
+            memos.tolist(),
+            _nullable(sources["flag_color"]),
+        )
+    ]
@@ -1,33 +1,54 @@
-from functools import reduce
+from collections.abc import Iterator
+from itertools import islice
 from os import environ as env
 
 from models import Budget
-from services._ynab_connection import YNABClient, CreateTransactionInterface
+from services._ynab_connection import (
+    YNABClient,
+    CategoryIndex,
+    CreateTransactionInterface,
+    MirrorIndex,
+)
 
+CREATE_CHUNK_SIZE = 100
+UPDATE_CHUNK_SIZE = 100
 
-def _process_transactions(
-    budget: Budget, main_budget: Budget, only_credit_card: bool = False
-) -> [CreateTransactionInterface]:
-    create_transactions = []
-
-    def parse_main_transactions(acc, t):
-        if t.account_id not in (
-            env.get("BOB_BUDGET_ACCOUNT"),
-            env.get("ARS_BUDGET_ACCOUNT"),
-        ):
-            return acc  # Skip
-        if t.subtransactions:
-            acc.extend(t.subtransactions)
-        else:
-            acc.append(t)
-        return acc
+BISA_CC_ACCOUNT_ID = "2096c0e6-e608-4373-8346-4414ee53664c"
 
-    main_budget_transactions = reduce(
-        parse_main_transactions, main_budget.transactions, []
-    )
+ENGINE_ITERATIVE = "iterative"
+ENGINE_COLUMNAR = "columnar"
 
-    BISA_CC_ACCOUNT_ID = "2096c0e6-e608-4373-8346-4414ee53664c"
 
+def _main_budget_transactions(main_budget: Budget):
+    """Flattened transactions of the main budget accounts that mirror other budgets"""
+    mirror_accounts = dict.fromkeys(
+        (env.get("BOB_BUDGET_ACCOUNT"), env.get("ARS_BUDGET_ACCOUNT"))
+    )
+    return [
+        flattened
+        for account_id in mirror_accounts
+        for t in main_budget.transaction_index.by_account(account_id)
+        for flattened in t.subtransactions or [t]
+    ]
+
+
+def main_budget_category_index(main_budget: Budget) -> CategoryIndex:
+    """Index of the main budget categories, warning about ambiguous names"""
+    category_index = CategoryIndex(main_budget.categories)
+    for names in category_index.ambiguous():
+        print(
+            f"Ambiguous categories in {main_budget.name}, the first one is used: "
+            + " / ".join(repr(name) for name in names)
+        )
+    return category_index
+
+
+def _mirror_candidates(budget: Budget, only_credit_card: bool = False):
+    """
+    (transaction, source) for every transaction of budget, or subtransaction
+    of a split one, that passes the sync filters; `source` is the one to
+    mirror. Whether it already is mirrored is not checked here.
+    """
     for transaction in budget.transactions:
         # BISA CC account filter
         if only_credit_card:
@@ -38,49 +59,62 @@ def _process_transactions(
             # Default: exclude BISA CC (imported directly to USD)
             if transaction.account_id == BISA_CC_ACCOUNT_ID:
                 continue
-        # Check if transaction has subtransations
-        if transaction.subtransactions:
-            for subtransaction in transaction.subtransactions:
-                if (
-                    "⚙️" in subtransaction.category_name
-                    or "🔗" in subtransaction.category_name
-                    or "Transfer :" in (subtransaction.payee_name or "")
-                    or subtransaction in main_budget_transactions
-                ):  # calls the __eq__ method for CreateTransactionInterface
-                    continue
-
-                create_transactions.append(
-                    CreateTransactionInterface.from_subtransaction(
-                        budget=budget,
-                        transaction=transaction,
-                        subtransaction=subtransaction,
-                        main_budget_categories=main_budget.categories,
-                        main_budget_transactions=main_budget_transactions,
-                    )
-                )
-        else:
+        # Subtransactions of a split are mirrored one by one
+        for source in transaction.subtransactions or [transaction]:
             if (
-                "⚙️" in transaction.category_name
-                or "🔗" in transaction.category_name
-                or "Transfer :" in (transaction.payee_name or "")
-                or transaction in main_budget_transactions
-            ):  # calls the __eq__ method for CreateTransactionInterface
+                "⚙️" in source.category_name
+                or "🔗" in source.category_name
+                or "Transfer :" in (source.payee_name or "")
+            ):
                 continue
+            yield transaction, source
 
-            create_transactions.append(
-                CreateTransactionInterface.from_transaction(
-                    budget=budget,
-                    transaction=transaction,
-                    main_budget_categories=main_budget.categories,
-                    main_budget_transactions=main_budget_transactions,
-                )
+
+def _process_transactions(
+    budget: Budget,
+    main_budget: Budget,
+    category_index: CategoryIndex,
+    only_credit_card: bool = False,
+) -> Iterator[CreateTransactionInterface]:
+    main_budget_transactions = _main_budget_transactions(main_budget)
+    rate_timeline = CreateTransactionInterface.rate_timeline(
+        budget, main_budget_transactions
+    )
+    mirror_index = MirrorIndex(main_budget_transactions)
+
+    for transaction, source in _mirror_candidates(budget, only_credit_card):
+        if source in mirror_index:
+            continue
+
+        if source is transaction:
+            yield CreateTransactionInterface.from_transaction(
+                budget=budget,
+                transaction=transaction,
+                category_index=category_index,
+                rate_timeline=rate_timeline,
             )
+        else:
+            yield CreateTransactionInterface.from_subtransaction(
+                budget=budget,
+                transaction=transaction,
+                subtransaction=source,
+                category_index=category_index,
+                rate_timeline=rate_timeline,
+            )
+
 
-    return create_transactions
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
 
 
 def sync_transactions_to_main_budget(
-    budget: Budget, main_budget: Budget, only_credit_card: bool = False
+    budget: Budget,
+    main_budget: Budget,
+    only_credit_card: bool = False,
+    engine: str = ENGINE_ITERATIVE,
+    category_index: CategoryIndex = None,
 ):
     """
     Check which new transactions needs to be written on the main_budget
@@ -89,12 +123,110 @@ def sync_transactions_to_main_budget(
         budget: Source budget to sync from
         main_budget: Destination budget to sync to
         only_credit_card: If True, sync only BISA CC transactions
+        engine: "iterative" (default) walks the transactions one by one;
+                "columnar" computes the same payloads with pandas, for
+                large backfills
+        category_index: main_budget_category_index(main_budget), to share
+                it between source budgets
     """
 
     mode = "CREDIT CARD ONLY" if only_credit_card else "ALL EXCEPT CREDIT CARD"
     print(f"Checking for new transactions... on budget {budget.name} [{mode}]")
 
-    create_transactions = _process_transactions(budget, main_budget, only_credit_card)
+    if category_index is None:
+        category_index = main_budget_category_index(main_budget)
+    # Only names the sync resolves: hidden categories and subtransactions
+    # count, ⚙️ / 🔗 categories and transfers don't
+    missing = category_index.missing(
+        source.category_name
+        for _, source in _mirror_candidates(budget, only_credit_card)
+    )
+    if missing:
+        print(
+            f"Categories of {budget.name} without a match in {main_budget.name} "
+            f"(mirrored uncategorized): {', '.join(missing)}"
+        )
+
+    if engine == ENGINE_COLUMNAR:
+        from services.columnar_sync import process_transactions
+
+        create_transactions = process_transactions(
+            budget, main_budget, category_index, only_credit_card
+        )
+    else:
+        create_transactions = _process_transactions(
+            budget, main_budget, category_index, only_credit_card
+        )
+
+    # Mirrors go out in bulk requests instead of one POST per transaction
+    for chunk in _chunks(create_transactions, CREATE_CHUNK_SIZE):
+        created = YNABClient.shared().create_transactions(
+            main_budget.id, [transaction.to_dict() for transaction in chunk]
+        )
+        if len(created) != len(chunk):
+            # Can't tell which one is which, report what YNAB says it made
+            print(
+                f"Warning: sent {len(chunk)} transactions to {main_budget.name} "
+                f"but YNAB reports {len(created)} created: "
+                f"{', '.join(result['id'] for result in created)}"
+            )
+            continue
+        for transaction, result in zip(chunk, created):
+            print(
+                f"Created transaction {result['id']} "
+                f"({transaction.date} {transaction.amount} {transaction.memo})"
+            )
+
+
+def revalue_mirrored_transactions(
+    budget: Budget,
+    main_budget: Budget,
+    since_date: str = None,
+    until_date: str = None,
+    dry_run: bool = False,
+):
+    """
+    Recompute the USD amount of transactions already mirrored from budget
+    into main_budget, against the exchange rates known today
+
+    Only mirrors dated within [since_date, until_date] whose amount changed
+    are sent, as bulk updates.
 
-    for transaction in create_transactions:
-        YNABClient().create_transaction(main_budget.id, transaction.to_dict())
+    Args:
+        budget: Source budget the mirrors come from
+        main_budget: Budget holding the mirrors (and the [TC:x] rates)
+        since_date: First date to revalue (YYYY-MM-DD), unbounded if None
+        until_date: Last date to revalue (YYYY-MM-DD), unbounded if None
+        dry_run: Only print what would change
+    """
+    print(f"Revaluing mirrored transactions... of budget {budget.name}")
+
+    rate_timeline = CreateTransactionInterface.rate_timeline(
+        budget, _main_budget_transactions(main_budget)
+    )
+    account_id = CreateTransactionInterface._account_id(budget)
+
+    updates = []
+    mirrors = main_budget.transaction_index.between(
+        since_date, until_date, account_id=account_id
+    )
+    for mirror in mirrors:
+        if mirror.subtransactions:
+            continue
+        source = budget.transaction_index.by_identifier(mirror.memo_identifier)
+        if source is None:
+            continue
+
+        amount = CreateTransactionInterface._amount(rate_timeline, source)
+        if amount != mirror.amount:
+            print(f"Revalue {mirror.id} {mirror.date}: {mirror.amount} -> {amount}")
+            updates.append({"id": mirror.id, "amount": amount})
+
+    if dry_run:
+        print(f"Dry run: {len(updates)} transactions would be updated")
+        return updates
+
+    for chunk in _chunks(updates, UPDATE_CHUNK_SIZE):
+        YNABClient.shared().update_transactions(main_budget.id, chunk)
+    print(f"Updated {len(updates)} transactions")
+    return updates
@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 
-from services._ynab_connection import YNABClient
+from services._ynab_connection import YNABClient, RateLimiter
 
 load_dotenv()
 
@@ -9,32 +9,36 @@ class YNABImporter:
     def __init__(self, budget_name: str, account_id: str):
         self._budget_name = budget_name
         self._account_id = account_id
-        self._client = YNABClient()
+        self._client = YNABClient.shared()
         self._budget_id = None
 
     @property
     def budget_id(self) -> str:
         """Resolve budget name to ID (cached after first call)."""
         if self._budget_id is None:
-            budgets = self._client.get_budgets()
-            budget = next(
-                (b for b in budgets if b.name == self._budget_name),
-                None,
-            )
-            if not budget:
-                raise ValueError(f'Budget "{self._budget_name}" not found in YNAB.')
-            self._budget_id = budget.id
+            self._budget_id = self._budget().id
         return self._budget_id
 
-    def get_last_transaction_date(self) -> str | None:
-        """Find the most recent transaction date for this account."""
-        transactions = self._client.get_transactions(self.budget_id)
-        account_txns = [t for t in transactions if t.account_id == self._account_id]
+    def _budget(self, priority=None, cached=True):
+        """This importer's budget, with its accounts (one request for both).
 
-        if not account_txns:
-            return None
+        The cached list is only good for resolving names: its balances can
+        be as old as the metadata TTL.
+        """
+        budgets = self._client.get_budgets(
+            priority=priority, cached=cached, include_accounts=True
+        )
+        budget = next(
+            (b for b in budgets if b.name == self._budget_name),
+            None,
+        )
+        if not budget:
+            raise ValueError(f'Budget "{self._budget_name}" not found in YNAB.')
+        return budget
 
-        return max(t.date for t in account_txns)
+    def get_last_transaction_date(self) -> str | None:
+        """Find the most recent transaction date for this account."""
+        return self._client.get_last_transaction_date(self.budget_id, self._account_id)
 
     def get_account_balance(self) -> dict:
         """Get balance for this importer's account.
@@ -42,9 +46,12 @@ class YNABImporter:
         Returns dict with cleared_balance, uncleared_balance, balance
         (all in milliunit × 1000 format).
         """
-        accounts = self._client.get_accounts(self.budget_id)
+        # Balance checks are informative only, let syncs and imports go first.
+        # Always fetched: a reconcile in the app must show up right away
+        budget = self._budget(priority=RateLimiter.PRIORITY_LOW, cached=False)
+        self._budget_id = budget.id
         account = next(
-            (a for a in accounts if a["id"] == self._account_id),
+            (a for a in budget.accounts if a["id"] == self._account_id),
             None,
         )
         if not account:
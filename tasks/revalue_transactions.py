@@ -0,0 +1,23 @@
+import asyncio
+
+from services import revalue_mirrored_transactions
+from tasks.sync_transactions import _load_budgets
+
+
+def revalue_transactions(since_date=None, until_date=None, dry_run=False):
+    """Re-apply current exchange rates to already mirrored transactions
+
+    Args:
+        since_date: First date of the window to revalue (YYYY-MM-DD format)
+        until_date: Last date of the window to revalue (YYYY-MM-DD format)
+        dry_run: If True, only print the changes
+    """
+
+    # Rates for the window may come from earlier [TC:x] transactions, so
+    # load the whole (delta-synced) history and filter by date afterwards
+    main_budget, sync_budgets = asyncio.run(_load_budgets(None))
+
+    for sync_budget in sync_budgets:
+        revalue_mirrored_transactions(
+            sync_budget, main_budget, since_date, until_date, dry_run
+        )
@@ -1,28 +1,97 @@
+import asyncio
+from datetime import date, timedelta
+from os import environ as env
+
 from services import (
-    relevant_budgets,
-    fill_transactions,
+    relevant_budgets_async,
+    fill_transactions_async,
+    hydrate_budgets_async,
     sync_transactions_to_main_budget,
 )
+from services.transaction_provider import ENGINE_ITERATIVE, main_budget_category_index
+from services._ynab_connection import AsyncYNABClient, YNABClient
+
+
+HYDRATION_ENDPOINTS = "endpoints"
+HYDRATION_BUDGET = "budget"
+
+# Transactions can be entered (or imported by the bank pipelines) days
+# after their date, so a default window reaches back past the last sync
+DEFAULT_LOOKBACK_DAYS = 7
+
+
+def default_since_date(only_credit_card=False):
+    """Start date for a sync run without an explicit one
+
+    The day the last completed sync of the same kind ran on, less
+    `YNAB_SYNC_LOOKBACK_DAYS` (7). None until one has completed, so the
+    window is never silently widened to the whole history.
+    """
+    last_date = YNABClient.shared().last_sync_date(_run_name(only_credit_card))
+    if last_date is None:
+        return None
+    lookback = int(env.get("YNAB_SYNC_LOOKBACK_DAYS", DEFAULT_LOOKBACK_DAYS))
+    return (date.fromisoformat(last_date) - timedelta(days=lookback)).isoformat()
+
 
+def _run_name(only_credit_card):
+    return "transactions:credit_card" if only_credit_card else "transactions"
 
-def sync_transactions(only_credit_card=False, since_date=None):
+
+def sync_transactions(
+    only_credit_card=False,
+    since_date=None,
+    hydration=HYDRATION_ENDPOINTS,
+    engine=ENGINE_ITERATIVE,
+):
     """Sync transactions from one budget to another
 
     Args:
         only_credit_card: If True, sync only BISA credit card transactions.
                          If False (default), sync all except credit card.
-        since_date: Start date for syncing (YYYY-MM-DD format). Required.
+        since_date: Start date for syncing (YYYY-MM-DD format). Defaults to
+                    default_since_date(); required before any run completed.
+        hydration: "endpoints" (default) loads categories and transactions
+                   per budget; "budget" loads each budget with a single
+                   `/budgets/{id}` export request.
+        engine: "iterative" (default) or "columnar" (pandas) computation of
+                the transactions to mirror; both produce the same ones.
     """
 
-    # Get budgets
-    main_budget, sync_budgets = relevant_budgets()
+    since_date = since_date or default_since_date(only_credit_card)
+    if since_date is None:
+        raise ValueError("since_date is required until a first sync has completed")
+    started_on = date.today().isoformat()
 
-    # Get main budget transactions
-    main_budget = fill_transactions(main_budget, since_date)
+    main_budget, sync_budgets = asyncio.run(_load_budgets(since_date, hydration))
 
-    # Get sync budgets transactions
-    sync_budgets = [fill_transactions(budget, since_date) for budget in sync_budgets]
+    # Category names are matched (and mismatches reported) once for all
+    category_index = main_budget_category_index(main_budget)
 
     # Check for new transactions
     for sync_budget in sync_budgets:
-        sync_transactions_to_main_budget(sync_budget, main_budget, only_credit_card)
+        sync_transactions_to_main_budget(
+            sync_budget, main_budget, only_credit_card, engine, category_index
+        )
+
+    YNABClient.shared().mark_synced(_run_name(only_credit_card), started_on)
+
+
+async def _load_budgets(since_date, hydration=HYDRATION_ENDPOINTS):
+    """Fetch budgets, categories and transactions with bounded concurrency"""
+    client = AsyncYNABClient()
+
+    if hydration == HYDRATION_BUDGET:
+        return await hydrate_budgets_async(since_date, client)
+
+    # Get budgets
+    main_budget, sync_budgets = await relevant_budgets_async(client)
+
+    # Get main and sync budgets transactions, all at once
+    main_budget, *sync_budgets = await asyncio.gather(
+        *(
+            fill_transactions_async(budget, since_date, client)
+            for budget in [main_budget, *sync_budgets]
+        )
+    )
+    return main_budget, sync_budgets
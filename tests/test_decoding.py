@@ -0,0 +1,55 @@
+import json
+import unittest
+
+from services._ynab_connection import decoding
+
+TRANSACTION = {
+    "id": "t1",
+    "date": "2026-01-02",
+    "account_id": "a1",
+    "category_id": None,
+    "memo": "Café ☕",
+    "amount": -1000,
+    "deleted": False,
+    "import_id": "YNAB:-1000:2026-01-02:1",
+}
+
+
+@unittest.skipUnless(decoding.msgspec, "msgspec is not installed")
+class DecodeDeltaTest(unittest.TestCase):
+    def test_rows_keep_the_raw_item(self):
+        for body in (
+            {"data": {"transactions": [TRANSACTION], "server_knowledge": 5}},
+            {"data": {"server_knowledge": 5, "transactions": [TRANSACTION]}},
+        ):
+            with self.subTest(body=body):
+                rows, server_knowledge = decoding.decode_delta(
+                    "transactions", json.dumps(body).encode()
+                )
+                ((columns, data),) = list(rows)
+                self.assertEqual(server_knowledge, 5)
+                self.assertEqual(columns["memo"], "Café ☕")
+                self.assertNotIn("amount", columns)
+                self.assertEqual(json.loads(data), TRANSACTION)
+
+    def test_categories_are_flattened(self):
+        body = {
+            "data": {
+                "category_groups": [
+                    {"id": "g1", "categories": [{"id": "c1", "name": "Food"}]},
+                    {"id": "g2", "categories": [{"id": "c2", "name": "Rent"}]},
+                ],
+                "server_knowledge": 7,
+            }
+        }
+        rows, _ = decoding.decode_delta("categories", json.dumps(body).encode())
+        self.assertEqual([columns["name"] for columns, _ in rows], ["Food", "Rent"])
+
+    def test_missing_knowledge(self):
+        body = json.dumps({"data": {"transactions": []}}).encode()
+        with self.assertRaises(ValueError):
+            decoding.decode_delta("transactions", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import unittest
+
+from services._ynab_connection.json_stream import JSONArrayStream
+
+ITEMS = [
+    {"id": "a", "memo": "Café ☕", "amount": -1000},
+    {"id": "b", "memo": "brackets ] and [ in a string", "subtransactions": [{"id": "c"}]},
+    {"id": "d", "memo": None, "deleted": True},
+]
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+class JSONArrayStreamTest(unittest.TestCase):
+    def decode(self, body, size):
+        stream = JSONArrayStream("transactions")
+        return stream, list(stream.items(chunked(json.dumps(body, indent=1), size)))
+
+    def test_items_survive_any_chunking(self):
+        body = {"data": {"transactions": ITEMS, "server_knowledge": 42}}
+        for size in (1, 2, 3, 7, 64, 1 << 16):
+            with self.subTest(size=size):
+                stream, items = self.decode(body, size)
+                self.assertEqual(items, ITEMS)
+                self.assertEqual(stream.int_field("server_knowledge"), 42)
+
+    def test_knowledge_before_the_array(self):
+        body = {"data": {"server_knowledge": 42, "transactions": ITEMS}}
+        for size in (1, 5, 1 << 16):
+            with self.subTest(size=size):
+                stream, items = self.decode(body, size)
+                self.assertEqual(items, ITEMS)
+                self.assertEqual(stream.int_field("server_knowledge"), 42)
+
+    def test_empty_array(self):
+        for body in (
+            {"data": {"transactions": [], "server_knowledge": 7}},
+            {"data": {"server_knowledge": 7, "transactions": []}},
+        ):
+            with self.subTest(body=body):
+                stream, items = self.decode(body, 1)
+                self.assertEqual(items, [])
+                self.assertEqual(stream.int_field("server_knowledge"), 7)
+
+    def test_missing_knowledge(self):
+        stream, items = self.decode({"data": {"transactions": ITEMS}}, 3)
+        self.assertEqual(items, ITEMS)
+        self.assertIsNone(stream.int_field("server_knowledge"))
+
+    def test_truncated_body(self):
+        text = json.dumps({"data": {"transactions": ITEMS}})
+        stream = JSONArrayStream("transactions")
+        with self.assertRaises(ValueError):
+            list(stream.items(chunked(text[: len(text) // 2], 4)))
+
+
+if __name__ == "__main__":
+    unittest.main()